@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import queue
+import random
+import resource
+import shutil
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from kaizen_seiri import SIGNATURES, ContentSniffer, ExtensionIndex, RuleSet
+
+# --- SEIRI BENCHMARKS ---
+# Usage: python3 bench_seiri.py <scenario> [--json out.json] [--compare previous.json]
+
+def _rand_ext(rng, parts=1):
+    return "".join("." + "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 5))) for _ in range(parts))
+
+def _extension_table(rng, n_exts, n_cats=100):
+    table = {f"Cat{i}": [] for i in range(n_cats)}
+    seen = set()
+    while len(seen) < n_exts:
+        ext = _rand_ext(rng, rng.choice((1, 1, 1, 2)))
+        if ext in seen: continue
+        seen.add(ext)
+        table[f"Cat{len(seen) % n_cats}"].append(ext)
+    return table, sorted(seen)
+
+def _linear_classify(extensions, name):
+    # The pre-index algorithm: scan every category with a list membership test
+    suffix = Path(name).suffix.lower()
+    for cat, exts in extensions.items():
+        if suffix in exts: return cat
+    return None
+
+def _time_per_call(fn, names, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for n in names: fn(n)
+        best = min(best, time.perf_counter() - t)
+    return best / len(names) * 1e9
+
+def bench_classify(args):
+    rng = random.Random(42)
+    results = []
+    for n_exts in (10, 100, 1000, 10000):
+        table, exts = _extension_table(rng, n_exts)
+        names = [f"file_{i}{rng.choice(exts) if rng.random() < 0.8 else _rand_ext(rng)}" for i in range(args.names)]
+        t = time.perf_counter()
+        index = ExtensionIndex(table)
+        compile_ms = (time.perf_counter() - t) * 1000
+        row = {
+            "extensions": n_exts,
+            "compile_ms": round(compile_ms, 3),
+            "index_ns": round(_time_per_call(index.classify, names, args.repeat), 1),
+            "linear_ns": round(_time_per_call(lambda n: _linear_classify(table, n), names, args.repeat), 1),
+        }
+        results.append(row)
+        print(f"{n_exts:>6} exts  compile {row['compile_ms']:>8.3f} ms  index {row['index_ns']:>8.1f} ns/file  linear {row['linear_ns']:>10.1f} ns/file")
+    return results
+
+# --- RULE ENGINE ---
+def _rule_specs(rng, n_rules, exts):
+    # Mostly "prefix_*.ext" globs (some size-bounded), plus a fixed handful of regex rules that
+    # pin no suffix: the realistic shape of a hand-written rule list
+    specs = [{"regex": rf"^{w}\d{{3}}", "dest": f"Generic{i}"} for i, w in enumerate(("scan", "IMG_", "DSC", "report", "tmp")[:min(5, n_rules)])]
+    while len(specs) < n_rules:
+        spec = {"glob": f"{''.join(rng.choices(string.ascii_lowercase, k=3))}_*{rng.choice(exts)}", "dest": f"Rule{len(specs)}"}
+        if rng.random() < 0.3: spec["min_size"] = rng.choice(("1k", "1M", "1G"))
+        specs.append(spec)
+    rng.shuffle(specs)
+    return specs
+
+def bench_rules(args):
+    rng = random.Random(42)
+    _, exts = _extension_table(rng, 200)
+    st = os.stat(__file__)
+    results = []
+    for n_rules in (10, 100, 500, 1000):
+        specs = _rule_specs(rng, n_rules, exts)
+        names = []
+        for i in range(args.names):
+            spec = rng.choice(specs)
+            if rng.random() < 0.5 and "glob" in spec: names.append(spec["glob"].replace("*", str(i)))  # Hits a rule's name part
+            else: names.append(f"file_{i}{rng.choice(exts)}")
+        t = time.perf_counter()
+        rules = RuleSet(specs)
+        compile_ms = (time.perf_counter() - t) * 1000
+        path = "/home/user/Downloads/x"
+        linear = lambda n: next((r for r in rules.rules if r.matches(n, path, lambda: st)), None)
+        row = {
+            "rules": n_rules,
+            "compile_ms": round(compile_ms, 3),
+            "index_ns": round(_time_per_call(lambda n: rules.match(n, path, lambda: st), names, args.repeat), 1),
+            "linear_ns": round(_time_per_call(linear, names, args.repeat), 1),
+        }
+        results.append(row)
+        print(f"{n_rules:>6} rules  compile {row['compile_ms']:>8.3f} ms  indexed {row['index_ns']:>8.1f} ns/file  linear {row['linear_ns']:>10.1f} ns/file")
+    return results
+
+# --- CONTENT SNIFFING ---
+def bench_sniff(args):
+    # Extensionless files: one per signature plus unknown blobs; cold = first sniff (open + pread),
+    # cached = unchanged file sniffed again (stat + LRU hit), match = trie walk on a head in memory
+    rng = random.Random(42)
+    root = tempfile.mkdtemp(prefix="kaizen-bench-sniff-")
+    try:
+        heads = []
+        for i in range(args.names):
+            if rng.random() < 0.8:
+                parts, _ = SIGNATURES[i % len(SIGNATURES)]
+                head = bytearray(os.urandom(ContentSniffer.HEAD))
+                for off, magic in parts: head[off:off + len(magic)] = magic
+            else: head = bytearray(os.urandom(ContentSniffer.HEAD))
+            heads.append(bytes(head))
+        paths = []
+        for i, head in enumerate(heads):
+            path = os.path.join(root, f"download({i})")
+            with open(path, "wb") as f: f.write(head + os.urandom(rng.choice((0, 4096, 65536))))
+            paths.append(path)
+        sniffer = ContentSniffer(cache_size=len(paths))
+        t = time.perf_counter()
+        found = sum(1 for p in paths if sniffer.sniff(p))
+        cold_us = (time.perf_counter() - t) / len(paths) * 1e6
+        row = {
+            "files": len(paths), "matched": found,
+            "cold_us": round(cold_us, 2),
+            "cached_us": round(_time_per_call(sniffer.sniff, paths, args.repeat) / 1000, 2),
+            "match_ns": round(_time_per_call(sniffer.match, heads, args.repeat), 1),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(f"{row['files']:>6} files  matched {row['matched']:>6}  cold {row['cold_us']:>7.2f} us/file  "
+          f"cached {row['cached_us']:>6.2f} us/file  match {row['match_ns']:>7.1f} ns/head")
+    return [row]
+
+# --- POLLING ---
+class _Discard:
+    def dispatch(self, event): pass
+
+def _cpu_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.process_time()
+        fn()
+        best = min(best, time.process_time() - t)
+    return best * 1000
+
+def _traced_mb(build):
+    # Python memory still held by what build() returns (or keeps)
+    import tracemalloc
+    tracemalloc.start()
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / 2 ** 20
+
+def bench_polling(args):
+    # DirectoryPoller against what watchdog's PollingEmitter does every interval (a full
+    # DirectorySnapshot plus a diff). quiet = nothing changed since the last poll, busy = one
+    # new file per poll. index_mb = Python memory held by one folder's snapshot.
+    from kaizen_seiri import DirectoryPoller, PollWatch
+    from watchdog.utils.dirsnapshot import DirectorySnapshot, DirectorySnapshotDiff
+    results = []
+    for n in args.entries:
+        root = tempfile.mkdtemp(prefix="kaizen-bench-poll-")
+        try:
+            for i in range(n): open(os.path.join(root, f"file_{i}{EXTS[i % len(EXTS)]}"), "w").close()
+            counter = iter(range(10 ** 9))
+            def arrive(): open(os.path.join(root, f"new_{next(counter)}.txt"), "w").close()
+
+            poller = DirectoryPoller()
+            def listed():
+                w = PollWatch(_Discard(), root)
+                poller.poll(w)
+                return w
+            index_mb = _traced_mb(listed)
+            w = PollWatch(_Discard(), root)
+            t = time.process_time()
+            poller.poll(w)
+            baseline_ms = (time.process_time() - t) * 1000
+            poller.poll(w)  # Confirms the folder mtime
+            ours = {"impl": "kaizen", "baseline_ms": baseline_ms, "index_mb": index_mb,
+                    "quiet_ms": _cpu_ms(lambda: poller.poll(w), args.repeat),
+                    "busy_ms": _cpu_ms(lambda: (arrive(), poller.poll(w)), args.repeat)}
+
+            index_mb = _traced_mb(lambda: DirectorySnapshot(root, recursive=False))
+            t = time.process_time()
+            snap = [DirectorySnapshot(root, recursive=False)]
+            baseline_ms = (time.process_time() - t) * 1000
+            def stock():
+                cur = DirectorySnapshot(root, recursive=False)
+                DirectorySnapshotDiff(snap[0], cur)
+                snap[0] = cur
+            theirs = {"impl": "watchdog", "baseline_ms": baseline_ms, "index_mb": index_mb,
+                      "quiet_ms": _cpu_ms(stock, args.repeat),
+                      "busy_ms": _cpu_ms(lambda: (arrive(), stock()), args.repeat)}
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+        for row in (ours, theirs):
+            row = {"entries": n, **{k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()}}
+            results.append(row)
+            print(f"{n:>7} entries  {row['impl']:<8}  first {row['baseline_ms']:>9.2f} ms  quiet {row['quiet_ms']:>8.3f} ms  "
+                  f"busy {row['busy_ms']:>8.2f} ms  index {row['index_mb']:>7.2f} MB")
+    return results
+
+# --- ORGANIZER END-TO-END ---
+SIZES = {"small": [(1.0, 512)], "mixed": [(0.6, 512), (0.3, 64 * 1024), (0.09, 1024 * 1024), (0.01, 8 * 1024 * 1024)]}
+EXTS = [".png", ".jpg", ".pdf", ".txt", ".py", ".zip"]
+
+def _percentile(sorted_vals, p):
+    if not sorted_vals: return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(p / 100 * len(sorted_vals)))]
+
+def _organize_case(case):
+    # Child process: HOME points at a scratch dir, so CONFIG and ~/Desktop are private to the run
+    import kaizen_seiri as ks
+    ks.CONFIG.load()
+    rng = random.Random(case["seed"])
+    home = Path.home()
+    watch = Path(case["watch"])
+    names = [f"file_{i}{EXTS[i % len(EXTS)]}" for i in range(case["files"])]
+    if case["collisions"]:
+        # Every incoming name (and its first few _N variants) already exists at the destination
+        index = ks.ExtensionIndex(ks.CONFIG.extensions)
+        for n in names:
+            cat, suffix = index.classify(n)
+            dest = home / "Desktop" / cat
+            dest.mkdir(parents=True, exist_ok=True)
+            stem = n[:-len(suffix)]
+            for v in [n] + [f"{stem}_{c}{suffix}" for c in range(1, 4)]: (dest / v).touch()
+    weights, sizes = zip(*SIZES[case["sizes"]])
+    payload = {sz: os.urandom(sz) for sz in set(sizes)}
+
+    gui_queue = queue.Queue()
+    created, landed = {}, {}
+    done = threading.Event()
+    def collect():
+        while len(landed) < len(names):
+            msg = gui_queue.get()
+            if msg[0] in ("moved", "duplicate"): landed[msg[1]] = time.perf_counter()
+        done.set()
+    peak_threads = [0]
+    def sample():
+        while not done.is_set():
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            time.sleep(0.005)
+    threading.Thread(target=collect, daemon=True).start()
+    threading.Thread(target=sample, daemon=True).start()
+
+    automator = ks.AutomationService(gui_queue)
+    automator.start_watching()
+    t0 = time.perf_counter()
+    for n in names:
+        with open(watch / n, "wb") as f: f.write(payload[rng.choices(sizes, weights)[0]])
+        created[n] = time.perf_counter()
+    burst_s = time.perf_counter() - t0
+    finished = done.wait(case["timeout"])
+    elapsed = max(landed.values(), default=t0) - t0
+    automator.stop_watching()
+
+    lat = sorted((landed[n] - created[n]) * 1000 for n in landed if n in created)
+    return {
+        "files": len(names), "moved": len(landed), "timed_out": not finished,
+        "burst_write_s": round(burst_s, 3), "elapsed_s": round(elapsed, 3),
+        "files_per_s": round(len(landed) / elapsed, 1) if elapsed > 0 else None,
+        "latency_ms": {f"p{p}": round(_percentile(lat, p), 2) if lat else None for p in (50, 90, 99, 100)},
+        "peak_threads": peak_threads[0],
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "moves": automator.handler.mover.summary() if hasattr(automator, "handler") else {},
+    }
+
+def _organize_run(case, watch_root=None, **config):
+    # One _organize_case in a child process with a private HOME whose config is `config`
+    home = tempfile.mkdtemp(prefix="kaizen-bench-")
+    watch = tempfile.mkdtemp(prefix="kaizen-bench-watch-", dir=watch_root or home)
+    with open(os.path.join(home, ".kaizen_hud_config.json"), "w") as f:
+        json.dump({"watch_paths": [watch], "seiri_sweep_on_start": False, **config}, f)
+    try:
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "_organize_case", "--case",
+                              json.dumps({**case, "watch": watch, "seed": 42})],
+                             env={**os.environ, "HOME": home}, capture_output=True, text=True, check=True)
+        return json.loads(out.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(watch, ignore_errors=True)
+        shutil.rmtree(home, ignore_errors=True)
+
+def bench_organize(args):
+    cross_root = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    devices = ["same"] + (["cross"] if cross_root and not args.same_device_only else [])
+    results = []
+    for files in args.bursts:
+        for collisions in (False, True):
+            for device in devices:
+                case = {"files": files, "collisions": collisions, "device": device, "sizes": args.sizes, "timeout": args.timeout}
+                row = {**case, **_organize_run(case, cross_root if device == "cross" else None)}
+                del row["timeout"]
+                results.append(row)
+                lat = row["latency_ms"]
+                print(f"{files:>6} files  {device:<5} collisions={'y' if collisions else 'n'}  "
+                      f"{row['files_per_s'] or 0:>8.1f} files/s  p50 {lat['p50']} ms  p99 {lat['p99']} ms  "
+                      f"threads {row['peak_threads']:>3}  rss {row['peak_rss_mb']} MB" + ("  TIMEOUT" if row["timed_out"] else ""))
+    return results
+
+# --- SHARDED ORGANIZER ---
+def bench_shards(args):
+    # Same burst through 1..N organizer processes (seiri_processes, files hash-partitioned).
+    # Content sniffing and hardlink dedup are on, so each file costs real classification and
+    # hashing work; speedup is files/s relative to the single-process run.
+    results = []
+    for files in args.bursts:
+        base = None
+        for processes in args.processes:
+            case = {"files": files, "collisions": False, "sizes": args.sizes, "timeout": args.timeout}
+            row = {"files": files, "processes": processes, "sizes": args.sizes,
+                   **_organize_run(case, seiri_processes=processes, seiri_shard="file",
+                                   seiri_sniff="always", seiri_duplicates="hardlink")}
+            base = base or row["files_per_s"]
+            row["speedup"] = round(row["files_per_s"] / base, 2) if base and row["files_per_s"] else None
+            results.append(row)
+            lat = row["latency_ms"]
+            print(f"{files:>6} files  {processes:>2} processes  {row['files_per_s'] or 0:>8.1f} files/s  x{row['speedup']}  "
+                  f"p50 {lat['p50']} ms  p99 {lat['p99']} ms" + ("  TIMEOUT" if row["timed_out"] else ""))
+    return results
+
+def compare(old_path, results):
+    # Side by side with a previous --json run of the same scenario
+    with open(old_path) as f: old = json.load(f)["results"]
+    key = lambda r: tuple(r.get(k) for k in ("files", "collisions", "device", "sizes", "extensions", "rules", "entries", "impl", "processes"))
+    before = {key(r): r for r in old}
+    for r in results:
+        o = before.get(key(r))
+        if not o: continue
+        for metric in ("files_per_s", "index_ns", "cold_us", "busy_ms"):
+            if r.get(metric) and o.get(metric):
+                print(f"{str(key(r)):<40} {metric}: {o[metric]} -> {r[metric]} ({(r[metric] / o[metric] - 1) * 100:+.1f}%)")
+
+SCENARIOS = {"classify": bench_classify, "organize": bench_organize, "polling": bench_polling, "rules": bench_rules,
+             "shards": bench_shards, "sniff": bench_sniff}
+
+def main():
+    if sys.argv[1:2] == ["_organize_case"]:
+        print(json.dumps(_organize_case(json.loads(sys.argv[3]))))
+        return
+    ap = argparse.ArgumentParser(description="KAIZEN Seiri benchmarks")
+    ap.add_argument("scenario", choices=sorted(SCENARIOS))
+    ap.add_argument("--names", type=int, default=10000, help="classify/rules/sniff: file names (files) per round")
+    ap.add_argument("--repeat", type=int, default=5, help="classify/rules/sniff/polling: rounds per measurement (best is kept)")
+    ap.add_argument("--entries", type=int, nargs="+", default=[1000, 100000], help="polling: folder sizes")
+    ap.add_argument("--bursts", type=int, nargs="+", default=[1, 100, 10000], help="organize/shards: files per burst")
+    ap.add_argument("--sizes", choices=sorted(SIZES), default="mixed", help="organize/shards: file size mix")
+    ap.add_argument("--timeout", type=float, default=300, help="organize/shards: max seconds to wait for a burst")
+    ap.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8], help="shards: organizer process counts")
+    ap.add_argument("--same-device-only", action="store_true", help="organize: skip the tmpfs -> disk runs")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="previous --json output to compare against")
+    args = ap.parse_args()
+    results = SCENARIOS[args.scenario](args)
+    if args.compare: compare(args.compare, results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"scenario": args.scenario, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "python": sys.version.split()[0], "cpus": os.cpu_count(), "results": results}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
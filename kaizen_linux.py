@@ -1,18 +1,21 @@
+import sys
+from kaizen_startup import StartupProfile
+
+PROFILE = StartupProfile()  # Before any heavy import so --profile-startup can attribute it
+
+if __name__ == "__main__" and any(a in ("--headless", "--rules") or a.startswith("--undo") for a in sys.argv[1:]):
+    # Daemon mode, undo and the rule check: organizer only, tkinter is never imported (no display needed)
+    from kaizen_seiri import main
+    sys.exit(main())
+
 import tkinter as tk
-from tkinter import messagebox
 import shutil
-import os
-import sys
-import time
-import threading
-import subprocess
-import webbrowser
-import json
 import queue
-import random
-from pathlib import Path
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+import time
+import collections
+from kaizen_seiri import CONFIG, METRICS, AutomationService, WakeQueue
+from kaizen_timer import FocusTimer
+PROFILE.mark("imports")
 
 # --- CONFIGURATION (LINUX) ---
 COLORS = {
@@ -40,143 +43,124 @@ QUOTES = [
     "Discipline is freedom."
 ]
 
-CONFIG_FILE = Path.home() / ".kaizen_hud_config.json"
-
-class Config:
-    def __init__(self):
-        self.watch_paths = [str(Path.home() / "Downloads")]
-        self.monk_urls = ["https://github.com"]
-        self.extensions = {
-            "Images": [".jpg", ".jpeg", ".png", ".webp", ".svg"],
-            "Documents": [".pdf", ".docx", ".txt", ".md", ".csv"],
-            "Archives": [".zip", ".tar.gz", ".7z", ".rar"],
-            "Code": [".py", ".js", ".cpp", ".html", ".sh", ".json"],
-            "Linux_Apps": [".AppImage", ".deb", ".rpm"] # Linux specific
-        }
-        self.pomo_work = 25
-        self.pomo_break = 5
-        self.stats = {"files_moved": 0, "minutes_focused": 0, "sessions_completed": 0}
-        self.load()
-
-    def to_dict(self): return self.__dict__
-    
-    def save(self):
-        try:
-            with open(CONFIG_FILE, "w") as f:
-                json.dump(self.to_dict(), f, indent=4)
-        except Exception as e: print(f"Config Error: {e}")
-
-    def load(self):
-        if CONFIG_FILE.exists():
-            try:
-                with open(CONFIG_FILE, "r") as f:
-                    self.__dict__.update(json.load(f))
-            except: pass
-
-    def increment_stat(self, key):
-        if key in self.stats:
-            self.stats[key] += 1
-            self.save()
-
-CONFIG = Config()
-
-class AutomationService:
-    def __init__(self, gui_queue):
-        self.gui_queue = gui_queue
-        self.observer = None
-        self._is_running = False
-
-    def start_watching(self):
-        if self._is_running: self.stop_watching()
-        self.observer = Observer()
-        handler = FileHandler(self.gui_queue)
-        
-        valid = 0
-        for p in CONFIG.watch_paths:
-            if os.path.isdir(p):
-                self.observer.schedule(handler, p, recursive=False)
-                valid += 1
-        
-        if valid > 0:
-            self.observer.start()
-            self._is_running = True
-
-    def stop_watching(self):
-        if self._is_running and self.observer:
-            self.observer.stop()
-            self.observer.join()
-            self._is_running = False
-
-class FileHandler(FileSystemEventHandler):
-    def __init__(self, gui_queue):
-        self.gui_queue = gui_queue
-
-    def on_created(self, event):
-        if event.is_directory: return
-        if event.src_path.endswith(('.part', '.tmp', '.crdownload')): return
-        threading.Thread(target=self.process_file, args=(Path(event.src_path),), daemon=True).start()
-
-    def process_file(self, file_path: Path):
-        time.sleep(1) # Short wait for Linux write finish
-        try:
-            if not file_path.exists(): return
-            
-            moved = False
-            for cat, exts in CONFIG.extensions.items():
-                if file_path.suffix.lower() in exts:
-                    dest = Path.home() / "Desktop" / cat
-                    dest.mkdir(parents=True, exist_ok=True)
-                    
-                    target = dest / file_path.name
-                    c = 1
-                    while target.exists():
-                        target = dest / f"{file_path.stem}_{c}{file_path.suffix}"
-                        c += 1
-                    
-                    shutil.move(str(file_path), str(target))
-                    CONFIG.increment_stat("files_moved")
-                    self.gui_queue.put(("notify", f"Kaizen: {file_path.name} -> {cat}"))
-                    moved = True
-                    break
-        except Exception as e:
-            print(f"Linux IO Error: {e}")
-
 class CustomNotification(tk.Toplevel):
-    def __init__(self, parent, message, color=COLORS["accent"]):
+    # One reusable toast window: hidden between uses, re-shown in a slot by ToastPool
+    def __init__(self, parent):
         super().__init__(parent)
+        self.withdraw()
         self.overrideredirect(True)
         # Linux specific: "splash" type hints to WM to avoid borders but keep on top
         self.attributes("-type", "splash") 
         self.attributes("-topmost", True)
         self.configure(bg=COLORS["panel"])
         
-        ws, hs = self.winfo_screenwidth(), self.winfo_screenheight()
+        self.bar = tk.Frame(self, bg=COLORS["accent"], width=4)
+        self.bar.pack(side="left", fill="y")
+        self.label = tk.Label(self, bg=COLORS["panel"], fg=COLORS["fg"], font=FONTS["small"],
+                              justify="left", wraplength=270)
+        self.label.pack(side="left", padx=10)
+        self.hide_job = None
+        self.shown_at = 0.0
+
+    def show(self, message, color, slot):
+        ws = self.winfo_screenwidth()
         w, h = 300, 50
         # Top Right on Linux usually interferes less with Docks
         x = ws - w - 30
-        y = 40 
+        y = 40 + slot * (h + 10)
         self.geometry(f"{w}x{h}+{x}+{y}")
-        
-        tk.Frame(self, bg=color, width=4).pack(side="left", fill="y")
-        tk.Label(self, text=message, bg=COLORS["panel"], fg=COLORS["fg"], font=FONTS["small"]).pack(side="left", padx=10)
-        self.after(3500, self.destroy)
+        self.bar.config(bg=color)
+        self.label.config(text=message)
+        self.deiconify()
+        self.lift()
+        if self.hide_job: self.after_cancel(self.hide_job)
+        self.hide_job = self.after(3500, self.hide)
+        self.shown_at = time.monotonic()
+
+    def hide(self):
+        self.hide_job = None
+        self.withdraw()
+
+class ToastPool:
+    # At most `size` toast windows ever exist; when all are showing, the oldest is reused
+    def __init__(self, parent, size=3):
+        self.parent = parent
+        self.size = size
+        self.toasts = []
+
+    def show(self, message, color=COLORS["accent"]):
+        toast = next((t for t in self.toasts if t.hide_job is None), None)
+        if toast is None and len(self.toasts) < self.size:
+            toast = CustomNotification(self.parent)
+            self.toasts.append(toast)
+        if toast is None: toast = min(self.toasts, key=lambda t: t.shown_at)
+        toast.show(message, color, self.toasts.index(toast))
+
+class MoveSummary:
+    # Folds per-file "moved" messages into one toast per window ("Kaizen: 412 files -> Images,
+    # 37 -> Documents") and keeps at least `min_gap` seconds between toasts, so the UI cost of a
+    # burst is a counter increment per file plus a constant number of windows.
+    def __init__(self, widget, show, window_ms=400, min_gap=1.0):
+        self.widget = widget
+        self.show = show
+        self.window_ms = window_ms
+        self.min_gap = min_gap
+        self.counts = collections.Counter()
+        self.last = None
+        self.job = None
+        self.next_ok = 0.0
+
+    def add(self, name, cat):
+        self.counts[cat] += 1
+        self.last = (name, cat)
+        if self.job is None:
+            delay = max(self.window_ms, int((self.next_ok - time.monotonic()) * 1000))
+            self.job = self.widget.after(delay, self.flush)
+
+    def flush(self):
+        self.job = None
+        total = sum(self.counts.values())
+        if total == 1: msg = f"Kaizen: {self.last[0]} -> {self.last[1]}"
+        else:
+            top = self.counts.most_common(3)
+            parts = [f"{top[0][1]} files -> {top[0][0]}"] + [f"{n} -> {cat}" for cat, n in top[1:]]
+            if len(self.counts) > 3: parts.append(f"+{total - sum(n for _, n in top)} more")
+            msg = "Kaizen: " + ", ".join(parts)
+        self.counts.clear()
+        self.next_ok = time.monotonic() + self.min_gap
+        self.show(msg)
 
 class KaizenHUD(tk.Tk):
     def __init__(self):
         super().__init__()
         self.withdraw()
-        self.gui_queue = queue.Queue()
+        self.gui_queue = WakeQueue()
         self.automator = AutomationService(self.gui_queue)
         
         self.pomo_active = False
-        self.seconds = CONFIG.pomo_work * 60
-        self.mode = "WORK"
+        self.timer = FocusTimer(lambda mode: (CONFIG.pomo_break if mode == "BREAK" else CONFIG.pomo_work) * 60)
+        self._tick_job = None
 
         self._init_window()
         self._init_ui()
-        self.automator.start_watching()
-        self.check_queue()
+        self.toasts = ToastPool(self)
+        self.moves = MoveSummary(self, self.toasts.show)
+        # Workers wake the Tk loop through the queue's pipe; nothing runs while it is empty
+        self.tk.createfilehandler(self.gui_queue.fileno(), tk.READABLE, self.check_queue)
         self.deiconify()
+        self.update_idletasks()
+        PROFILE.mark("window")
+        # The watcher (and watchdog itself) load once the HUD is on screen
+        self.after_idle(self._start_services)
+
+    def _start_services(self):
+        self.automator.start_watching()
+        PROFILE.mark("watcher")
+        if PROFILE.enabled:
+            print(PROFILE.report())
+            self.automator.stop_watching()
+            self.destroy()
+            sys.exit(1 if PROFILE.over_budget() else 0)
 
     def _init_window(self):
         self.overrideredirect(True)
@@ -203,16 +187,27 @@ class KaizenHUD(tk.Tk):
                              command=self.toggle, relief="flat", font=FONTS["bold"])
         self.btn.pack(fill="x", padx=20, pady=10)
         
-        tk.Button(self, text="EXIT", bg=COLORS["bg"], fg="#555", bd=0, 
-                  command=self.quit_app).pack(side="bottom")
+        bar = tk.Frame(self, bg=COLORS["bg"])
+        bar.pack(side="bottom", fill="x")
+        tk.Button(bar, text="SWEEP", bg=COLORS["bg"], fg="#555", bd=0,
+                  command=self.automator.sweep).pack(side="left", padx=20)
+        tk.Button(bar, text="EXIT", bg=COLORS["bg"], fg="#555", bd=0, 
+                  command=self.quit_app).pack(side="right", padx=20)
 
-    def check_queue(self):
+    def check_queue(self, fd=None, mask=None):
+        # Drains everything posted since the last wakeup in one batch
+        self.gui_queue.clear_wakeup()
+        METRICS.inc("kaizen_gui_wakeups_total")
+        handled = 0
         try:
             while True:
                 msg = self.gui_queue.get_nowait()
-                if msg[0] == "notify": CustomNotification(self, msg[1])
+                handled += 1
+                if msg[0] == "moved": self.moves.add(msg[1], msg[2])
+                elif msg[0] == "duplicate": self.moves.add(msg[1], f"{msg[2]} (duplicate, dropped)")
+                elif msg[0] == "notify": self.toasts.show(msg[1])
         except queue.Empty: pass
-        self.after(200, self.check_queue)
+        if not handled: METRICS.inc("kaizen_gui_idle_wakeups_total")
 
     def toggle(self):
         self.pomo_active = not self.pomo_active
@@ -220,33 +215,46 @@ class KaizenHUD(tk.Tk):
             self.btn.config(text="STOP", fg=COLORS["alert"])
             # Try running 'code' or 'code-oss'
             cmd = "code" if shutil.which("code") else "code-oss"
-            if shutil.which(cmd): subprocess.Popen([cmd])
+            if shutil.which(cmd):
+                import subprocess
+                subprocess.Popen([cmd])
+            self.timer.resume()
             self.tick()
         else:
+            self._apply_timer_events(self.timer.pause())
+            if self._tick_job: self.after_cancel(self._tick_job)
+            self._tick_job = None
             self.btn.config(text="START FOCUS", fg="white")
 
     def tick(self):
-        if self.pomo_active and self.seconds > 0:
-            self.seconds -= 1
-            if self.mode == "WORK" and self.seconds % 60 == 0: CONFIG.increment_stat("minutes_focused")
-            m, s = divmod(self.seconds, 60)
-            self.lbl_time.config(text=f"{m:02}:{s:02}")
-            self.after(1000, self.tick)
-        elif self.pomo_active:
-            # Linux Sound (System Bell or 'aplay' fallback could be added)
-            print("\a") 
-            self.mode = "BREAK" if self.mode == "WORK" else "WORK"
-            self.seconds = (CONFIG.pomo_break if self.mode == "BREAK" else CONFIG.pomo_work) * 60
-            CustomNotification(self, f"Switch to {self.mode}", COLORS["break"])
-            self.tick()
+        # Re-armed for just after the next displayed second, from a monotonic deadline
+        self._tick_job = None
+        if not self.pomo_active: return
+        self._apply_timer_events(self.timer.poll())
+        m, s = divmod(self.timer.display_seconds(), 60)
+        self.lbl_time.config(text=f"{m:02}:{s:02}")
+        self._tick_job = self.after(self.timer.next_delay_ms(), self.tick)
+
+    def _apply_timer_events(self, events):
+        for kind, value in events:
+            if kind == "minutes": CONFIG.increment_stat("minutes_focused", value)
+            elif kind == "switch":
+                # Linux Sound (System Bell or 'aplay' fallback could be added)
+                print("\a") 
+                self.toasts.show(f"Switch to {value}", COLORS["break"])
 
     def start_move(self, e): self.x, self.y = e.x, e.y
     def do_move(self, e): self.geometry(f"+{self.winfo_x()+(e.x-self.x)}+{self.winfo_y()+(e.y-self.y)}")
     
     def quit_app(self):
         self.automator.stop_watching()
+        CONFIG.flush()
         sys.exit()
 
+def main():
+    CONFIG.load()
+    PROFILE.mark("config")
+    KaizenHUD().mainloop()
+
 if __name__ == "__main__":
-    app = KaizenHUD()
-    app.mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
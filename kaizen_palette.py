@@ -0,0 +1,102 @@
+import functools
+import time
+
+# Tk-free color math and frame scheduling shared by the HUDs.
+# The widgets hand in their own after/after_cancel, so nothing here imports tkinter.
+
+STEPS = 256  # Gradient resolution; finer than a 0..255 channel step is never visible
+
+def hex_to_rgb(hex_val):
+    hex_val = hex_val.lstrip('#')
+    return tuple(int(hex_val[i:i+2], 16) for i in (0, 2, 4))
+
+def rgb_to_hex(rgb):
+    return '#%02x%02x%02x' % tuple(map(int, rgb))
+
+@functools.lru_cache(maxsize=64)
+def gradient(color1, color2, steps=STEPS):
+    # Every color between the pair, parsed once and kept for the life of the process
+    c1, c2 = hex_to_rgb(color1), hex_to_rgb(color2)
+    last = steps - 1
+    return tuple(rgb_to_hex(a + (b - a) * i / last for a, b in zip(c1, c2)) for i in range(steps))
+
+def shade(color1, color2, t, steps=STEPS):
+    # Color at t (clamped to 0..1) along the pair's gradient
+    lut = gradient(color1, color2, steps)
+    return lut[int(min(1.0, max(0.0, t)) * (steps - 1) + 0.5)]
+
+class Animator:
+    # Runs frame() every interval_ms only while there is something to animate.
+    # frame() returns False to go idle; start() wakes it again. hide()/show() follow the
+    # window's <Unmap>/<Map> so a minimized or withdrawn HUD schedules no callbacks at all.
+    def __init__(self, after, after_cancel, frame, interval_ms, clock=time.perf_counter):
+        self.after, self.after_cancel = after, after_cancel
+        self.frame = frame
+        self.interval_ms = interval_ms
+        self.clock = clock
+        self.job = None
+        self.active = False   # Wants frames
+        self.visible = True
+        self.frames = 0
+        self.busy = 0.0       # Seconds spent inside frame()
+        self.worst = 0.0
+        self.active_time = 0.0
+        self.active_since = None
+
+    def start(self):
+        self.active = True
+        self._arm()
+
+    def stop(self):
+        self.active = False
+        self._disarm()
+
+    def hide(self):
+        self.visible = False
+        self._disarm()
+
+    def show(self):
+        self.visible = True
+        if self.active: self._arm()
+
+    def running(self):
+        return self.job is not None
+
+    def _arm(self):
+        if self.job is None and self.active and self.visible:
+            self.active_since = self.clock()
+            self.job = self.after(0, self._run)
+
+    def _disarm(self):
+        if self.job is None: return
+        self.after_cancel(self.job)
+        self.job = None
+        self.active_time += self.clock() - self.active_since
+
+    def _run(self):
+        t = self.clock()
+        try: more = self.frame()
+        except Exception as e:
+            print(f"Animation Error: {e}")
+            more = False
+        dt = self.clock() - t
+        self.frames += 1
+        self.busy += dt
+        self.worst = max(self.worst, dt)
+        if more and self.active and self.visible:
+            self.job = self.after(self.interval_ms, self._run)
+        else:
+            self.job = None
+            self.active = self.active and bool(more)
+            self.active_time += self.clock() - self.active_since
+
+    def stats(self):
+        # Frame cost and how much of the wall clock the animation was scheduled at all
+        active = self.active_time + (self.clock() - self.active_since if self.job is not None else 0.0)
+        return {
+            "frames": self.frames,
+            "frame_ms_avg": round(self.busy / self.frames * 1000, 3) if self.frames else 0.0,
+            "frame_ms_max": round(self.worst * 1000, 3),
+            "active_s": round(active, 3),
+            "busy_pct": round(self.busy / active * 100, 2) if active else 0.0,
+        }
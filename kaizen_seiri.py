@@ -0,0 +1,2683 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import threading
+import json
+import queue
+import heapq
+import errno
+import fcntl
+import bisect
+import stat
+import hashlib
+import re
+import fnmatch
+import collections
+import contextlib
+import itertools
+from pathlib import Path
+
+# Tk-free Seiri core (config, file organizer, headless daemon) shared by the Linux HUD
+# in kaizen_linux.py and `--headless` mode, which must run without a display.
+# watchdog and http.server are imported on first use: they cost more than everything else
+# here combined and the HUD paints before either is needed.
+
+# --- CONFIGURATION (LINUX) ---
+CONFIG_FILE = Path.home() / ".kaizen_hud_config.json"
+TEMP_SUFFIXES = ('.part', '.tmp', '.crdownload')  # In-progress downloads, never organized
+DEDUP_DIR = Path.home() / ".cache" / "kaizen" / "dedup"  # One content index per destination folder
+JOURNAL_FILE = Path.home() / ".local" / "state" / "kaizen" / "moves.jsonl"  # Append-only move log
+MAX_USER_WATCHES = "/proc/sys/fs/inotify/max_user_watches"
+WATCH_KERNEL_BYTES = 1024  # Unswappable kernel memory per inotify watch on 64-bit (inotify(7): "up to 1 kB")
+MOUNTINFO = "/proc/self/mountinfo"
+# Filesystems (and any fuse.*) where inotify sees local changes at best, so watch paths on them are polled
+NETWORK_FS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "lustre", "davfs", "fuse"}
+
+def atomic_write(path, data):
+    # Readers (and a crash mid-write) only ever see the old or the new file, never a torn one
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class Config:
+    def __init__(self):
+        self.watch_paths = [str(Path.home() / "Downloads")]
+        self.monk_urls = ["https://github.com"]
+        self.extensions = {
+            "Images": [".jpg", ".jpeg", ".png", ".webp", ".svg"],
+            "Documents": [".pdf", ".docx", ".txt", ".md", ".csv"],
+            "Archives": [".zip", ".tar.gz", ".7z", ".rar"],
+            "Code": [".py", ".js", ".cpp", ".html", ".sh", ".json"],
+            "Linux_Apps": [".AppImage", ".deb", ".rpm"] # Linux specific
+        }
+        self.pomo_work = 25
+        self.pomo_break = 5
+        self.seiri_workers = 4         # Concurrent file moves
+        self.seiri_bulk_workers = 1    # ...plus this many for big files that must be copied or hashed
+        self.seiri_bulk_size = "64M"   # "Big" for the above; such files never hold up the small ones ("" = no bulk lane)
+        self.seiri_processes = 1       # Organizer processes; >1 spreads classification and hashing over cores
+        self.seiri_shard = "file"      # How files are split between them: file (hash of the file's path) | path (by watch path)
+        self.seiri_queue_size = 1024   # Pending files before the watcher blocks (backpressure)
+        self.seiri_settle_min = 0.05   # First write-completion probe (s), doubled per unsettled probe
+        self.seiri_settle_max = 2.0    # Probe interval cap (s); also the safety net when inotify reports closes
+        self.seiri_coalesce_window = 0.1  # Events for one path closer than this (s) are merged
+        self.seiri_sweep_on_start = True  # Organize files that arrived while KAIZEN was not running
+        self.seiri_recursive = False   # Also watch subfolders of the watch paths; new ones are picked up as they appear
+        self.seiri_max_depth = 4       # Subfolder levels below a watch path (0 = unlimited)
+        self.seiri_include = []        # If set, only folders whose path below the watch path matches (and their subfolders)
+        self.seiri_exclude = [".*", "node_modules", "__pycache__"]  # Folder names/relative paths never watched or entered
+        self.seiri_max_watches = 0     # Total inotify watches KAIZEN may use (0 = half of fs.inotify.max_user_watches)
+        self.seiri_poll = "auto"       # Poll instead of inotify: auto (network and FUSE mounts) | always | never
+        self.seiri_poll_min = 1.0      # Poll interval (s) right after a change...
+        self.seiri_poll_max = 30.0     # ...doubling up to this while the folder stays quiet
+        self.seiri_sniff = "off"       # Content sniffing: off | fallback (names without an extension) | always
+        self.seiri_duplicates = "keep"  # File identical to one already at the destination: keep | drop | hardlink
+        # Ordered rules checked before `extensions`, first match wins. Keys (all optional but dest):
+        # glob, regex, ext, min_size/max_size ("1G"), min_age/max_age ("7d"), source, dest.
+        # A relative dest is a folder on the Desktop, like a category.
+        self.seiri_rules = []
+        self.metrics_port = 0          # Prometheus text endpoint on 127.0.0.1:<port> (0 = off)
+        self.metrics_socket = ""       # ...or on this Unix socket path
+        self.stats_flush_interval = 5.0  # Max seconds a stat change waits in memory before being written
+        self.stats_flush_every = 100     # ...or write as soon as this many changes are pending
+        self.stats = {"files_moved": 0, "minutes_focused": 0, "sessions_completed": 0}
+        self._lock = threading.RLock()      # Guards stats and the dirty counter
+        self._save_lock = threading.Lock()  # Serializes snapshot + write so an older snapshot never lands last
+        self._flush_cond = threading.Condition(self._lock)
+        self._flusher = None
+        self._dirty = 0
+        self._loaded = False  # Entry points call load() once they are past the first paint
+
+    def to_dict(self): return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
+    
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps(self.to_dict(), indent=4)
+                self._dirty = 0
+            try: atomic_write(CONFIG_FILE, data)
+            except Exception as e: print(f"Config Error: {e}")
+
+    def reload(self):
+        # Re-reads the file and returns the names of the settings that changed. Stats are
+        # skipped: the in-memory counters are ahead of the file until the next flush.
+        try:
+            with open(CONFIG_FILE, "r") as f: data = json.load(f)
+        except Exception: return set()
+        changed = set()
+        for k, v in data.items():
+            if k == "stats" or k.startswith("_") or getattr(self, k, None) == v: continue
+            setattr(self, k, v)
+            changed.add(k)
+        return changed
+
+    def load(self):
+        if self._loaded: return
+        self._loaded = True
+        if CONFIG_FILE.exists():
+            try:
+                with open(CONFIG_FILE, "r") as f:
+                    self.__dict__.update(json.load(f))
+            except: pass
+
+    def increment_stat(self, key, n=1):
+        # Counters live in memory; a write-behind thread persists them in batches
+        with self._lock:
+            if key not in self.stats: return
+            self.stats[key] += n
+            self._dirty += 1
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="config-flush", daemon=True)
+                self._flusher.start()
+            if self._dirty == 1 or self._dirty >= self.stats_flush_every: self._flush_cond.notify()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while not self._dirty: self._flush_cond.wait()
+                # Debounce: the first pending change starts the clock, a full batch cuts it short
+                deadline = time.monotonic() + self.stats_flush_interval
+                while self._dirty < self.stats_flush_every and (left := deadline - time.monotonic()) > 0:
+                    self._flush_cond.wait(left)
+            self.save()
+
+    def flush(self):
+        if self._dirty: self.save()
+
+CONFIG = Config()
+
+# --- METRICS ---
+class Histogram:
+    # Fixed buckets (seconds), so observe() is a bisect plus two additions
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+               0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.sum += value
+
+class Metrics:
+    # Counters and stage histograms for the Seiri pipeline, rendered as Prometheus text
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = collections.defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}                            # (name, labels) -> Histogram
+        self.gauges = {}                                # (name, labels) -> callable
+        self.remote = {}                                # shard -> its latest snapshot()
+
+    def inc(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock: self.counters[key] += n
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None: h = self.histograms[key] = Histogram()
+            h.observe(value)
+
+    def lap(self, stage, since):
+        # Records the time spent in `stage` since `since` and returns now, for chaining stages
+        now = time.perf_counter()
+        self.observe("kaizen_seiri_stage_seconds", now - since, stage=stage)
+        return now
+
+    def gauge(self, name, fn, **labels):
+        with self.lock: self.gauges[(name, tuple(sorted(labels.items())))] = fn
+
+    def snapshot(self):
+        # Picklable copy of the counters and histograms, sent by a shard process to its parent
+        with self.lock: return dict(self.counters), {k: (list(h.counts), h.sum) for k, h in self.histograms.items()}
+
+    def absorb(self, shard, snapshot):
+        # Rendered next to our own series, with a shard label
+        with self.lock: self.remote[shard] = snapshot
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}" if items else ""
+
+    @staticmethod
+    def _value(v):
+        # Every digit: counters past 1e6 must keep counting for rate()
+        v = float(v)
+        return str(int(v)) if v.is_integer() else repr(v)
+
+    def render(self):
+        out = []
+        with self.lock:
+            counters = list(self.counters.items())
+            hist_data = [(k, list(h.counts), h.sum) for k, h in self.histograms.items()]
+            for shard, (c, hs) in self.remote.items():
+                extra = (("shard", shard),)
+                counters += [((name, labels + extra), v) for (name, labels), v in c.items()]
+                hist_data += [((name, labels + extra), counts, total) for (name, labels), (counts, total) in hs.items()]
+            gauges = sorted(self.gauges.items(), key=lambda kv: kv[0])
+        counters.sort()
+        hist_data.sort(key=lambda row: row[0])
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed: out.append(f"# TYPE {name} counter"); typed.add(name)
+            out.append(f"{name}{self._labels(labels)} {self._value(value)}")
+        for (name, labels), fn in gauges:
+            try: value = fn()
+            except Exception: continue
+            if name not in typed: out.append(f"# TYPE {name} gauge"); typed.add(name)
+            out.append(f"{name}{self._labels(labels)} {self._value(value)}")
+        for (name, labels), counts, total in hist_data:
+            if name not in typed: out.append(f"# TYPE {name} histogram"); typed.add(name)
+            acc = 0
+            for le, c in zip(Histogram.BUCKETS + ("+Inf",), counts):
+                acc += c
+                out.append(f"{name}_bucket{self._labels(labels, [('le', le)])} {acc}")
+            out.append(f"{name}_sum{self._labels(labels)} {self._value(total)}")
+            out.append(f"{name}_count{self._labels(labels)} {acc}")
+        return "\n".join(out) + "\n"
+
+METRICS = Metrics()
+
+class StackSampler:
+    # Runtime-toggled sampling profiler over every thread: counts collapsed stacks
+    # ("a;b;c N", flamegraph.pl format) every `interval` seconds while running.
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.thread: return
+        self.samples.clear()
+        self._stop.clear()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.thread: return self.report()
+        self._stop.set()
+        self.thread.join()
+        self.thread = None
+        return self.report()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me: continue
+                stack = []
+                while frame:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def report(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+SAMPLER = StackSampler()
+
+class MetricsRequestHandler:
+    # Mixed into http.server.BaseHTTPRequestHandler by serve_metrics()
+    # GET /metrics             Prometheus text
+    # GET /profile?action=...  start | stop (returns collapsed stacks) | status
+    def do_GET(self):
+        from urllib.parse import urlparse, parse_qs
+        url = urlparse(self.path)
+        if url.path == "/metrics": body = METRICS.render()
+        elif url.path == "/profile":
+            action = parse_qs(url.query).get("action", ["status"])[0]
+            if action == "start":
+                SAMPLER.start()
+                body = "sampling\n"
+            elif action == "stop": body = SAMPLER.stop()
+            else: body = "sampling\n" if SAMPLER.thread else "idle\n"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self): return "local"
+    def log_message(self, *args): pass
+
+def serve_metrics():
+    # Starts the endpoint configured in CONFIG (if any) on a daemon thread; returns the server.
+    # http.server is only imported when an endpoint is actually configured.
+    if not (CONFIG.metrics_socket or CONFIG.metrics_port): return None
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(MetricsRequestHandler, BaseHTTPRequestHandler): pass
+
+    class UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def get_request(self):
+            conn, _ = super().get_request()
+            return conn, ("local", 0)  # BaseHTTPRequestHandler expects an (host, port) address
+
+    try:
+        if CONFIG.metrics_socket:
+            if os.path.exists(CONFIG.metrics_socket): os.unlink(CONFIG.metrics_socket)
+            server = UnixMetricsServer(CONFIG.metrics_socket, Handler)
+        else:
+            server = ThreadingHTTPServer(("127.0.0.1", CONFIG.metrics_port), Handler)
+            server.daemon_threads = True
+    except OSError as e:
+        print(f"Linux Metrics Error: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+# --- GUI HANDOFF ---
+class WakeQueue(queue.Queue):
+    # queue.Queue that also signals a pipe when it goes from drained to non-empty, so a GUI
+    # loop can sleep on fileno() (Tk createfilehandler) instead of polling get_nowait()
+    def __init__(self):
+        super().__init__()
+        self._rfd, self._wfd = os.pipe()
+        os.set_blocking(self._rfd, False)
+        os.set_blocking(self._wfd, False)
+        self._signaled = False
+        self._wake_lock = threading.Lock()
+
+    def fileno(self): return self._rfd
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        with self._wake_lock:
+            if self._signaled: return
+            self._signaled = True
+        try: os.write(self._wfd, b"\0")
+        except BlockingIOError: pass  # Pipe already full of wakeups
+
+    def clear_wakeup(self):
+        # Call before draining: anything put after this point signals again
+        with self._wake_lock: self._signaled = False
+        try: os.read(self._rfd, 4096)
+        except BlockingIOError: pass
+
+# --- SEIRI ENGINE ---
+class WorkerPool:
+    # Fixed set of worker threads fed by a bounded queue. submit() blocks while the
+    # queue is full, so a burst of events throttles the watcher instead of spawning threads.
+    def __init__(self, workers, queue_size):
+        self.tasks = queue.Queue(maxsize=max(1, queue_size))
+        self.threads = []
+        self.size = 0
+        self.resize(workers)
+
+    def resize(self, workers):
+        # Growing starts threads; shrinking queues sentinels, so busy workers finish first
+        workers = max(1, workers)
+        for i in range(self.size, workers):
+            t = threading.Thread(target=self._run, name=f"seiri-{len(self.threads)}", daemon=True)
+            self.threads.append(t)
+            t.start()
+        for _ in range(workers, self.size): self.tasks.put(None)
+        self.size = workers
+
+    def submit(self, fn, *args):
+        self.tasks.put((fn, args))
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None: return
+                fn, args = task
+                fn(*args)
+            except Exception as e: print(f"Seiri Worker Error: {e}")
+            finally: self.tasks.task_done()
+
+    def shutdown(self):
+        # Sentinels queue up behind pending work, so everything already accepted is drained
+        for _ in range(self.size): self.tasks.put(None)
+        for t in self.threads: t.join()
+
+def watch_root(path):
+    # The (longest) watch path `path` is under, or "" for none
+    return max((r for r in CONFIG.watch_paths if path.startswith(os.path.join(r, ""))), key=len, default="")
+
+class Lane:
+    # One class of work in the LanePool: its own worker threads and a FIFO per watch path,
+    # served round-robin so one busy folder cannot starve the others. submit() blocks while
+    # the lane holds queue_size items (backpressure), like WorkerPool.
+    def __init__(self, name, workers, queue_size):
+        self.name = name
+        self.queue_size = max(1, queue_size)
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.queues = {}                    # watch path -> deque of (fn, args, enqueued at)
+        self.order = collections.deque()    # watch paths with queued work, next turn first
+        self.depth = 0
+        self.threads = []
+        self.size = 0
+        self.retire = 0
+        self.closing = False
+        self.resize(workers)
+
+    def resize(self, workers):
+        # Growing starts threads; shrinking retires idle ones as they come up for work
+        workers = max(1, workers)
+        with self.lock:
+            for i in range(self.size, workers):
+                t = threading.Thread(target=self._run, name=f"seiri-{self.name}-{len(self.threads)}", daemon=True)
+                self.threads.append(t)
+                t.start()
+            self.retire += max(0, self.size - workers)
+            self.size = workers
+            self.not_empty.notify_all()
+
+    def submit(self, source, fn, *args):
+        with self.lock:
+            while self.depth >= self.queue_size: self.not_full.wait()
+            q = self.queues.get(source)
+            if q is None:
+                q = self.queues[source] = collections.deque()
+                self.order.append(source)
+            q.append((fn, args, time.perf_counter()))
+            self.depth += 1
+            self.not_empty.notify()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                while not (self.depth or self.retire or self.closing): self.not_empty.wait()
+                if self.retire:
+                    self.retire -= 1
+                    return
+                if not self.depth: return  # Shut down and drained
+                q = self.queues[self.order[0]]
+                fn, args, queued = q.popleft()
+                if q: self.order.rotate(-1)  # This watch path goes to the back of the line
+                else: del self.queues[self.order.popleft()]
+                self.depth -= 1
+                self.not_full.notify()
+            METRICS.observe("kaizen_seiri_lane_wait_seconds", time.perf_counter() - queued, lane=self.name)
+            try: fn(*args)
+            except Exception as e: print(f"Seiri Worker Error: {e}")
+
+    def shutdown(self):
+        # Everything already accepted is drained first
+        with self.lock:
+            self.closing = True
+            self.not_empty.notify_all()
+        for t in self.threads: t.join()
+
+class LanePool:
+    # Organizer work routed by estimated cost, so one 20 GB cross-device copy never holds up
+    # the screenshots behind it. "bulk" takes files of at least seiri_bulk_size whose move is a
+    # copy (source on another device than ~/Desktop) or that get hashed for seiri_duplicates;
+    # "fast" takes everything else, including same-device renames of any size. The estimate
+    # is one stat(): the real destination is not known until classify(). submit(fn, path, ...)
+    # calls fn(path, ...) on a worker of the chosen lane.
+    def __init__(self, workers, bulk_workers, queue_size):
+        self.lanes = {"fast": Lane("fast", workers, queue_size), "bulk": Lane("bulk", bulk_workers, queue_size)}
+        self.dest_dev = None
+        self.bulk_raw, self.bulk_size = None, None
+
+    def route(self, path):
+        if CONFIG.seiri_bulk_size != self.bulk_raw:
+            self.bulk_raw = CONFIG.seiri_bulk_size
+            try: self.bulk_size = _quantity(self.bulk_raw, UNITS) if self.bulk_raw else None
+            except ValueError as e:
+                print(f"Linux Config Error: seiri_bulk_size: {e}")
+                self.bulk_size = None
+        if self.bulk_size is None: return "fast"
+        try: st = os.stat(path)
+        except OSError: return "fast"  # Gone: process_file only has to notice
+        if st.st_size < self.bulk_size: return "fast"
+        if CONFIG.seiri_duplicates in ("drop", "hardlink"): return "bulk"
+        if self.dest_dev is None:
+            desktop = Path.home() / "Desktop"
+            self.dest_dev = os.stat(desktop if desktop.exists() else Path.home()).st_dev
+        return "bulk" if st.st_dev != self.dest_dev else "fast"
+
+    def submit(self, fn, path, *args):
+        self.lanes[self.route(path)].submit(watch_root(path), fn, path, *args)
+
+    def resize(self, workers, bulk_workers):
+        self.lanes["fast"].resize(workers)
+        self.lanes["bulk"].resize(bulk_workers)
+
+    def depth(self):
+        return sum(lane.depth for lane in self.lanes.values())
+
+    def shutdown(self):
+        for lane in self.lanes.values(): lane.shutdown()
+
+class ExtensionIndex:
+    # Compiled form of CONFIG.extensions: lowercase suffix chain (".tar.gz") -> category.
+    # classify() probes at most `depth` suffixes of a name, longest first, so its cost
+    # does not depend on how many categories or extensions are configured.
+    def __init__(self, extensions):
+        self.table = {}
+        self.depth = 1
+        for cat, exts in extensions.items():
+            for ext in exts:
+                ext = ext.strip().lower()
+                if not ext: continue
+                if not ext.startswith("."): ext = "." + ext
+                self.table.setdefault(ext, cat)  # First category listing an extension keeps it
+                self.depth = max(self.depth, ext.count("."))
+
+    def classify(self, name):
+        # -> (category, suffix as spelled in the name), or (None, "") when nothing matches
+        lower = name.lower()
+        start = 1 if lower.startswith(".") else 0  # A dotfile's leading dot is not a suffix
+        dots, i = [], len(lower)
+        while len(dots) < self.depth:
+            i = lower.rfind(".", start, i)
+            if i < 0: break
+            dots.append(i)
+        for i in reversed(dots):
+            cat = self.table.get(lower[i:])
+            if cat: return cat, name[i:]
+        return None, ""
+
+UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+DURATIONS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def _quantity(value, units):
+    # "1G" / "500m" / "7d" / 42 -> number (bytes or seconds)
+    if isinstance(value, (int, float)): return value
+    m = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]?)[bB]?\s*", str(value))
+    if not m or m.group(2).lower() not in units: raise ValueError(f"bad quantity {value!r}")
+    return float(m.group(1)) * units[m.group(2).lower()]
+
+class Rule:
+    # One compiled entry of CONFIG.seiri_rules
+    KEYS = ("glob", "regex", "ext", "min_size", "max_size", "min_age", "max_age", "source")
+
+    def __init__(self, spec):
+        unknown = set(spec) - set(self.KEYS) - {"dest"}
+        if unknown: raise ValueError(f"unknown keys {sorted(unknown)}")
+        if not spec.get("dest"): raise ValueError("missing dest")
+        self.spec = spec
+        self.label = spec["dest"]
+        self.dest = Path(os.path.expanduser(spec["dest"]))
+        if not self.dest.is_absolute(): self.dest = Path.home() / "Desktop" / spec["dest"]
+        exts = spec.get("ext") or []
+        if isinstance(exts, str): exts = exts.split("|")
+        self.exts = tuple(e.strip().lower() if e.strip().startswith(".") else "." + e.strip().lower() for e in exts if e.strip())
+        self.glob = re.compile(fnmatch.translate(spec["glob"]), re.IGNORECASE) if spec.get("glob") else None
+        self.regex = re.compile(spec["regex"]) if spec.get("regex") else None
+        self.min_size = _quantity(spec["min_size"], UNITS) if "min_size" in spec else None
+        self.max_size = _quantity(spec["max_size"], UNITS) if "max_size" in spec else None
+        self.min_age = _quantity(spec["min_age"], DURATIONS) if "min_age" in spec else None
+        self.max_age = _quantity(spec["max_age"], DURATIONS) if "max_age" in spec else None
+        self.source = os.path.join(os.path.abspath(os.path.expanduser(spec["source"])), "") if spec.get("source") else None
+        self.needs_stat = any(v is not None for v in (self.min_size, self.max_size, self.min_age, self.max_age))
+
+    def suffixes(self):
+        # Last-dot suffixes a matching name must end with (possibly none at all), or None when
+        # the rule does not pin a suffix
+        keys = {"." + e.rsplit(".", 1)[1] for e in self.exts} if self.exts else None
+        pattern = self.spec.get("glob") or ""
+        tail = pattern.rsplit(".", 1)[1].lower() if "." in pattern else ""
+        if tail and not any(c in tail for c in "*?[]"):
+            keys = {"." + tail} if keys is None else keys & {"." + tail}
+        return keys
+
+    def lead(self):
+        # First character every matching name starts with (lowercase), or None
+        pattern = self.spec.get("glob") or ""
+        return pattern[0].lower() if pattern and pattern[0] not in "*?[" else None
+
+    def name_matches(self, name):
+        if self.exts and not name.lower().endswith(self.exts): return False
+        if self.glob and not self.glob.fullmatch(name): return False
+        if self.regex and not self.regex.search(name): return False
+        return True
+
+    def matches(self, name, path, st):
+        if not self.name_matches(name): return False
+        if self.source and not path.startswith(self.source): return False
+        if self.needs_stat:
+            st = st()
+            if st is None: return False
+            if self.min_size is not None and st.st_size < self.min_size: return False
+            if self.max_size is not None and st.st_size > self.max_size: return False
+            age = time.time() - st.st_mtime
+            if self.min_age is not None and age < self.min_age: return False
+            if self.max_age is not None and age > self.max_age: return False
+        return True
+
+    def row(self):
+        # (dest, 'glob:invoice_*.pdf, size>=1G, from:~/Scans'): the two-column shape of SeiriEditor
+        parts = ["ext:" + "|".join(self.exts)] if self.exts else []
+        for prefix, key in ROW_FIELDS:
+            if key != "ext" and self.spec.get(key) not in (None, ""): parts.append(prefix + _row_value(self.spec[key]))
+        return self.label, ", ".join(parts)
+
+# Row fields in the order Rule.row() writes them. A value containing a comma (a regex like
+# a{1,3}, a glob, a path) or starting with a quote is written as a JSON string, so the
+# ", " between fields is never ambiguous.
+ROW_FIELDS = (("ext:", "ext"), ("glob:", "glob"), ("re:", "regex"), ("size>=", "min_size"), ("size<=", "max_size"),
+              ("age>=", "min_age"), ("age<=", "max_age"), ("from:", "source"))
+
+def _row_value(value):
+    text = str(value)
+    return json.dumps(text) if not text or "," in text or text[0] == '"' or text != text.strip() else text
+
+def rule_from_row(dest, text):
+    # Inverse of Rule.row(): an edited row back to a CONFIG.seiri_rules entry
+    spec, rest = {"dest": dest.strip()}, text.strip()
+    decoder = json.JSONDecoder()
+    while rest:
+        prefix, key = next(((p, k) for p, k in ROW_FIELDS if rest.startswith(p)), (None, None))
+        if prefix is None: raise ValueError(f"cannot parse {rest!r}")
+        rest = rest[len(prefix):]
+        if rest.startswith('"'):
+            value, end = decoder.raw_decode(rest)
+            rest = rest[end:].lstrip()
+        else:
+            end = rest.find(",")
+            value, rest = (rest, "") if end < 0 else (rest[:end], rest[end:])
+            value = value.strip()
+        if rest and rest[0] != ",": raise ValueError(f"expected ',' before {rest!r}")
+        rest = rest[1:].lstrip()
+        spec[key] = value
+    return spec
+
+class RuleSet:
+    # CONFIG.seiri_rules compiled for first-match evaluation. Rules that pin a suffix (ext, or
+    # a glob ending in a literal extension) are indexed by it, and within a suffix by the
+    # glob's literal first character; the rest form a generic list
+    # whose name patterns are also OR-ed into one regex, so a name none of them can match
+    # skips the whole list. A file therefore only visits the rules that could apply to it,
+    # in their configured order, however many rules there are.
+    def __init__(self, specs):
+        self.rules = []
+        for i, spec in enumerate(specs or []):
+            try: self.rules.append(Rule(spec))
+            except (ValueError, TypeError, re.error, KeyError) as e: print(f"Linux Rule Error: rule {i + 1}: {e}")
+        self.by_suffix = collections.defaultdict(dict)  # ".pdf" -> {first char or None: rule positions}
+        self.generic = []                               # rule positions with no suffix
+        named = []
+        for pos, rule in enumerate(self.rules):
+            keys = rule.suffixes()
+            if keys is None:
+                self.generic.append(pos)
+                named.append(rule)
+            else:
+                for k in keys: self.by_suffix[k].setdefault(rule.lead(), []).append(pos)
+        # Generic rules without any name pattern match every name; they disable the prefilter
+        # Regexes with groups are searched on their own: joined with the others, their group
+        # numbers would shift and a backreference such as \1 would point at another rule's group
+        self.prefilter = None  # (joined pattern or None, patterns searched separately)
+        if named and all(r.glob or r.regex for r in named):
+            alone = [r for r in named if r.regex and r.regex.groups]
+            joined = [r for r in named if not (r.regex and r.regex.groups)]
+            try:
+                self.prefilter = (re.compile("|".join(
+                    f"(?:{r.regex.pattern})" if r.regex else f"\\A(?i:{r.glob.pattern})" for r in joined)) if joined else None,
+                    tuple(r.regex for r in alone))
+            except re.error: self.prefilter = None
+
+    def _candidates(self, name):
+        dot = name.rfind(".")
+        bucket = self.by_suffix.get(name[dot:].lower()) if dot > 0 else None
+        indexed = ()
+        if bucket:
+            lead, anylead = bucket.get(name[:1].lower(), ()), bucket.get(None, ())
+            indexed = sorted(lead + anylead) if lead and anylead else lead or anylead
+        generic = self.generic
+        if generic and self.prefilter and not self._prefiltered(name): generic = ()
+        if not generic: return indexed
+        if not indexed: return generic
+        return sorted(set(indexed).union(generic))
+
+    def _prefiltered(self, name):
+        joined, alone = self.prefilter
+        return bool(joined and joined.search(name)) or any(p.search(name) for p in alone)
+
+    def match(self, name, path, st):
+        # -> first matching Rule or None. st() is only called (once) if a candidate needs size/age.
+        cache = []
+        def lazy_stat():
+            if not cache:
+                try: cache.append(st())
+                except OSError: cache.append(None)
+            return cache[0]
+        for pos in self._candidates(name):
+            rule = self.rules[pos]
+            if rule.matches(name, path, lazy_stat): return rule
+        return None
+
+    def may_match(self, name):
+        # Name-only pre-check (sweeps): could any rule apply to a file with this name?
+        return any(self.rules[pos].name_matches(name) for pos in self._candidates(name))
+
+    def rows(self):
+        return [r.row() for r in self.rules]
+
+# Magic numbers: ((offset, bytes), ...) -> extensions in preference order. The first
+# extension CONFIG.extensions knows about decides the category.
+SIGNATURES = [
+    (((0, b"\x89PNG\r\n\x1a\n"),), (".png",)),
+    (((0, b"\xff\xd8\xff"),), (".jpg", ".jpeg")),
+    (((0, b"GIF87a"),), (".gif",)),
+    (((0, b"GIF89a"),), (".gif",)),
+    (((0, b"RIFF"), (8, b"WEBP")), (".webp",)),
+    (((0, b"RIFF"), (8, b"WAVE")), (".wav",)),
+    (((0, b"<svg"),), (".svg",)),
+    (((0, b"%PDF-"),), (".pdf",)),
+    (((0, b"PK\x03\x04"),), (".zip",)),
+    (((0, b"PK\x05\x06"),), (".zip",)),
+    (((0, b"7z\xbc\xaf\x27\x1c"),), (".7z",)),
+    (((0, b"Rar!\x1a\x07"),), (".rar",)),
+    (((0, b"\x1f\x8b"),), (".gz", ".tar.gz")),
+    (((0, b"BZh"),), (".bz2", ".tar.bz2")),
+    (((0, b"\xfd7zXZ\x00"),), (".xz", ".tar.xz")),
+    (((257, b"ustar"),), (".tar",)),
+    (((0, b"!<arch>\ndebian"),), (".deb",)),
+    (((0, b"\xed\xab\xee\xdb"),), (".rpm",)),
+    (((0, b"ID3"),), (".mp3",)),
+    (((0, b"OggS"),), (".ogg",)),
+    (((0, b"fLaC"),), (".flac",)),
+    (((4, b"ftyp"),), (".mp4",)),
+    (((0, b"#!/bin/sh"),), (".sh",)),
+    (((0, b"#!/bin/bash"),), (".sh",)),
+    (((0, b"#!/usr/bin/env bash"),), (".sh",)),
+    (((0, b"#!/usr/bin/env python"),), (".py",)),
+    (((0, b"#!/usr/bin/python"),), (".py",)),
+]
+
+# Formats other formats are built on (docx/xlsx/jar are zips, .tgz is gzip): when a name
+# has its own extension, these signatures say nothing about what the file is
+CONTAINER_EXTS = {".zip", ".gz", ".tar.gz", ".bz2", ".tar.bz2", ".xz", ".tar.xz", ".tar"}
+
+class ContentSniffer:
+    # Magic-number classifier for names the extension rules cannot place. Reads the first
+    # HEAD bytes with a single pread and walks a byte trie per signature offset, so the
+    # cost is one open plus a few dict lookups regardless of how many signatures exist.
+    # Results are cached by (dev, ino, size, mtime_ns): re-sniffing an unchanged file
+    # (sweeps, retries) is a stat and a dict hit.
+    HEAD = 512
+
+    def __init__(self, signatures=SIGNATURES, cache_size=4096):
+        self.tries = {}  # offset -> {byte: node, None: [(further parts, exts)]}
+        for parts, exts in signatures:
+            (offset, magic), rest = parts[0], parts[1:]
+            node = self.tries.setdefault(offset, {})
+            for b in magic: node = node.setdefault(b, {})
+            node.setdefault(None, []).append((rest, exts))
+        self.cache = collections.OrderedDict()  # LRU
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def match(self, head):
+        # -> extensions of the most specific (longest) matching signature, or ()
+        best, best_len = (), 0
+        for offset, node in self.tries.items():
+            depth = 0
+            for b in head[offset:]:
+                node = node.get(b)
+                if node is None: break
+                depth += 1
+                for rest, exts in node.get(None, ()):
+                    n = depth + sum(len(m) for _, m in rest)
+                    if n > best_len and all(head[o:o + len(m)] == m for o, m in rest):
+                        best, best_len = exts, n
+        return best
+
+    def sniff(self, path):
+        st = os.stat(path, follow_symlinks=False)
+        if not stat.S_ISREG(st.st_mode) or not st.st_size: return ()
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            exts = self.cache.get(key)
+            if exts is not None:
+                self.cache.move_to_end(key)
+                METRICS.inc("kaizen_seiri_sniff_total", result="cached")
+                return exts
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK)  # Never block on a FIFO swapped in
+        try: head = os.pread(fd, self.HEAD, 0)
+        finally: os.close(fd)
+        exts = self.match(head)
+        METRICS.inc("kaizen_seiri_sniff_total", result="matched" if exts else "unknown")
+        with self.lock:
+            self.cache[key] = exts
+            if len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+        return exts
+
+class NameIndex:
+    # Taken names per destination folder (seeded by one os.scandir, kept current by our own
+    # reservations and by a watch on the folder) plus a next-suffix counter per (stem, suffix),
+    # so a free "name_N.ext" is found with set lookups instead of one stat call per candidate.
+    def __init__(self, on_seed=None):
+        self.lock = threading.Lock()
+        self.names = {}     # dest dir -> set of entry names
+        self.counters = {}  # (dest, stem, suffix) -> next N to try
+        self.on_seed = on_seed
+
+    def reserve(self, dest, stem, suffix):
+        # The claim is also made on disk with an exclusive create, so neither another worker,
+        # another process nor a file the index has not seen yet can ever be overwritten.
+        while True:
+            target = self._pick(dest, stem, suffix)
+            if self._create(target): return Path(target)
+
+    def reserve_for(self, journal, dest, stem, suffix, kind, src, size, ino, rule):
+        # reserve() for a move: its journal intent is durable before the placeholder exists,
+        # so a crash in between never leaves an empty file that recovery does not know about.
+        # -> (target, journal id)
+        while True:
+            target = self._pick(dest, stem, suffix)
+            jid = journal.begin(kind, src, target, size, ino, rule)
+            try: created = self._create(target)
+            except BaseException:
+                journal.abort(jid)
+                raise
+            if created: return Path(target), jid
+            journal.abort(jid, wait=True)  # That intent names someone else's file: never recover it
+
+    def _pick(self, dest, stem, suffix):
+        dest = str(dest)
+        seeded = False
+        with self.lock:
+            names = self.names.get(dest)
+            if names is None:
+                with os.scandir(dest) as it: names = self.names[dest] = {e.name for e in it}
+                seeded = True
+            name = stem + suffix
+            if name in names:
+                key = (dest, stem, suffix)
+                c = self.counters.get(key, 1)
+                while f"{stem}_{c}{suffix}" in names: c += 1
+                self.counters[key] = c + 1
+                name = f"{stem}_{c}{suffix}"
+            names.add(name)
+        # Outside the lock: the observer dispatches destination events while holding its own lock
+        if seeded and self.on_seed: self.on_seed(dest)
+        return os.path.join(dest, name)
+
+    @staticmethod
+    def _create(target):
+        try: os.close(os.open(target, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600))
+        except FileExistsError: return False  # Name is in the set now, the next pick skips it
+        return True
+
+    def release(self, target):
+        # Undo a reservation whose move failed (only ever removes our own empty placeholder)
+        try:
+            if os.path.getsize(target) == 0: os.unlink(target)
+        except OSError: pass
+        self.discard(target)
+
+    def add(self, path):
+        dest, name = os.path.split(path)
+        with self.lock:
+            if dest in self.names: self.names[dest].add(name)
+
+    def discard(self, path):
+        dest, name = os.path.split(str(path))
+        with self.lock:
+            if dest in self.names: self.names[dest].discard(name)
+
+    def invalidate(self, dest):
+        with self.lock:
+            self.names.pop(str(dest), None)
+
+class KeyedLocks:
+    # One lock per key, created on first use and dropped once nobody holds or waits for it
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}  # key -> [Lock, holders and waiters]
+
+    def acquire(self, key):
+        with self.lock:
+            slot = self.locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        slot[0].acquire()
+
+    def release(self, key):
+        with self.lock:
+            slot = self.locks[key]
+            slot[1] -= 1
+            if not slot[1]: del self.locks[key]
+        slot[0].release()
+
+    @contextlib.contextmanager
+    def hold(self, *key):
+        self.acquire(key)
+        try: yield
+        finally: self.release(key)
+
+class DuplicateIndex:
+    # Content index per destination folder, persisted in DEDUP_DIR so a restart does not
+    # rehash anything. A candidate file is compared in tiers: size (free, from the index),
+    # then a hash of its head and tail blocks, then a full streaming hash, and each tier
+    # only runs against the entries that survived the previous one. Hashes are computed on
+    # demand and trusted only while the entry's (size, mtime_ns, ino) is unchanged.
+    BLOCK = 64 * 1024
+
+    def __init__(self, on_seed=None, on_add=None, locks=None):
+        self.lock = threading.Lock()
+        self.dirs = {}   # dest dir -> {name: [size, mtime_ns, ino, partial, full]}
+        self.sizes = {}  # dest dir -> {size: set of names}
+        self.dirty = set()
+        self.on_seed = on_seed
+        self.on_add = on_add
+        self.locks = locks or KeyedLocks()
+
+    def hold(self, dest, path):
+        # Held from find() until the file is placed and add()ed (or dropped): otherwise two
+        # identical files arriving together would both pass the check before either is
+        # indexed. Only files that could match each other (same dest, same size) wait.
+        return self.locks.hold(str(dest), os.stat(path).st_size)
+
+    def _path(self, dest):
+        # Rules can send files anywhere, so two destinations may share a folder name
+        return DEDUP_DIR / f"{os.path.basename(dest)}-{hashlib.blake2b(dest.encode(), digest_size=4).hexdigest()}.json"
+
+    def _seed(self, dest):
+        # Saved hashes are reused for entries whose stat still matches; the rest start unhashed
+        try:
+            with open(self._path(dest)) as f: saved = json.load(f).get("entries", {})
+        except (OSError, ValueError): saved = {}
+        entries, sizes = {}, collections.defaultdict(set)
+        with os.scandir(dest) as it:
+            for e in it:
+                if e.name.startswith("."): continue  # Our own partial files and placeholders' kin
+                try: st = e.stat(follow_symlinks=False)
+                except OSError: continue
+                if not stat.S_ISREG(st.st_mode) or not st.st_size: continue
+                old = saved.get(e.name)
+                entry = [st.st_size, st.st_mtime_ns, st.st_ino, None, None]
+                if old and old[:3] == entry[:3]: entry = old
+                entries[e.name] = entry
+                sizes[st.st_size].add(e.name)
+        self.dirs[dest], self.sizes[dest] = entries, sizes
+        self.dirty.add(dest)
+
+    def _hashes(self, path, size, full):
+        # -> (partial, full or None). Up to two blocks the partial hash already covers everything.
+        with open(path, "rb") as f:
+            if size <= 2 * self.BLOCK:
+                digest = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+                return digest, digest
+            h = hashlib.blake2b(digest_size=16)
+            h.update(os.pread(f.fileno(), self.BLOCK, 0))
+            h.update(os.pread(f.fileno(), self.BLOCK, size - self.BLOCK))
+            partial = h.hexdigest()
+            if not full: return partial, None
+            h = hashlib.blake2b(digest_size=16)
+            while chunk := f.read(1024 * 1024): h.update(chunk)
+            return partial, h.hexdigest()
+
+    def _entry_hash(self, dest, name, tier):
+        # Hash of an indexed file (tier 3 = partial, 4 = full), computed once and kept
+        with self.lock: entry = list(self.dirs[dest].get(name) or ())
+        if not entry: return None
+        if entry[tier] is None:
+            path = os.path.join(dest, name)
+            try:
+                st = os.stat(path, follow_symlinks=False)
+                if (st.st_size, st.st_mtime_ns, st.st_ino) != tuple(entry[:3]):
+                    self.note(path)  # Changed behind our back: rebucket, no match this time
+                    return None
+                partial, full = self._hashes(path, st.st_size, tier == 4)
+            except OSError: return None
+            entry[3], entry[4] = partial, full or entry[4]
+            with self.lock:
+                if self.dirs[dest].get(name, [None] * 3)[:3] == entry[:3]:
+                    self.dirs[dest][name] = entry
+                    self.dirty.add(dest)
+        return entry[tier]
+
+    def find(self, dest, path):
+        # -> (name of an identical file in dest or None, (size, partial, full) of `path`)
+        dest = str(dest)
+        seeded = False
+        size = os.stat(path).st_size
+        with self.lock:
+            if dest not in self.dirs:
+                self._seed(dest)
+                seeded = True
+            candidates = list(self.sizes[dest].get(size, ())) if size else []
+        if seeded and self.on_seed: self.on_seed(dest)
+        if not candidates: return None, (size, None, None)
+        METRICS.inc("kaizen_seiri_dedup_checks_total", tier="size")
+        partial, full = self._hashes(path, size, False)
+        candidates = [n for n in candidates if self._entry_hash(dest, n, 3) == partial]
+        if not candidates: return None, (size, partial, full)
+        METRICS.inc("kaizen_seiri_dedup_checks_total", tier="partial")
+        if full is None: partial, full = self._hashes(path, size, True)
+        METRICS.inc("kaizen_seiri_dedup_checks_total", tier="full")
+        for n in candidates:
+            if self._entry_hash(dest, n, 4) == full: return n, (size, partial, full)
+        return None, (size, partial, full)
+
+    def add(self, target, hashes=(None, None, None)):
+        # Records a file we just placed; hashes computed while checking it are carried over
+        dest, name = os.path.split(str(target))
+        try: st = os.stat(target, follow_symlinks=False)
+        except OSError: return
+        with self.lock:
+            if dest not in self.dirs: return
+            self._drop(dest, name)
+            partial, full = (hashes[1], hashes[2]) if hashes[0] == st.st_size else (None, None)
+            self.dirs[dest][name] = [st.st_size, st.st_mtime_ns, st.st_ino, partial, full]
+            self.sizes[dest][st.st_size].add(name)
+            self.dirty.add(dest)
+        if self.on_add: self.on_add(str(target))
+
+    def note(self, path):
+        # Destination watch: an entry appeared or changed; re-stat it, keep hashes if it is the same file
+        dest, name = os.path.split(str(path))
+        if name.startswith("."): return
+        try: st = os.stat(path, follow_symlinks=False)
+        except OSError: return self.discard(path)
+        with self.lock:
+            if dest not in self.dirs: return
+            old = self.dirs[dest].get(name)
+            if old and old[:3] == [st.st_size, st.st_mtime_ns, st.st_ino]: return
+            self._drop(dest, name)
+            if not stat.S_ISREG(st.st_mode) or not st.st_size: return
+            self.dirs[dest][name] = [st.st_size, st.st_mtime_ns, st.st_ino, None, None]
+            self.sizes[dest][st.st_size].add(name)
+            self.dirty.add(dest)
+
+    def discard(self, path):
+        dest, name = os.path.split(str(path))
+        with self.lock:
+            if dest in self.dirs and self._drop(dest, name): self.dirty.add(dest)
+
+    def _drop(self, dest, name):
+        old = self.dirs[dest].pop(name, None)
+        if old: self.sizes[dest][old[0]].discard(name)
+        return old
+
+    def save(self):
+        with self.lock:
+            snapshot = {d: dict(self.dirs[d]) for d in self.dirty if d in self.dirs}
+            self.dirty.clear()
+        if not snapshot: return
+        try:
+            DEDUP_DIR.mkdir(parents=True, exist_ok=True)
+            for dest, entries in snapshot.items():
+                atomic_write(self._path(dest), json.dumps({"dest": dest, "entries": entries}))
+        except OSError as e: print(f"Linux Dedup Error: {e}")
+
+class EventHandler:
+    # Duck-typed stand-in for watchdog's FileSystemEventHandler (the observer only ever calls
+    # dispatch), so defining handlers does not pull watchdog in at import time
+    def dispatch(self, event):
+        self.on_any_event(event)
+        method = getattr(self, f"on_{event.event_type}", None)
+        if method: method(event)
+
+    def on_any_event(self, event): pass
+
+class DestinationHandler(EventHandler):
+    # Keeps the NameIndex and DuplicateIndex in sync with changes made to destination folders
+    # behind our back
+    def __init__(self, index, dedup):
+        self.index = index
+        self.dedup = dedup
+
+    def on_created(self, event):
+        if event.is_directory: return
+        self.index.add(event.src_path)
+        self.dedup.note(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory: self.dedup.note(event.src_path)
+
+    def on_deleted(self, event):
+        if event.src_path in self.index.names: self.index.invalidate(event.src_path)
+        elif not event.is_directory:
+            self.index.discard(event.src_path)
+            self.dedup.discard(event.src_path)
+
+    def on_moved(self, event):
+        if event.is_directory: return
+        self.index.discard(event.src_path)
+        self.index.add(event.dest_path)
+        self.dedup.discard(event.src_path)
+        self.dedup.note(event.dest_path)
+
+class EventCoalescer:
+    # Collapses the created/modified/moved/closed events of a file into exactly one dispatch
+    # per final path, released once its writer is done. With inotify, IN_CLOSE_WRITE
+    # (watchdog's on_closed) releases a file immediately; otherwise size/mtime are re-probed
+    # with exponential backoff until two consecutive probes agree. Further events inside
+    # seiri_coalesce_window push the next probe back instead of creating more work.
+    def __init__(self, on_ready, close_events):
+        self.on_ready = on_ready
+        self.close_events = close_events
+        self.pending = {}   # path -> [last stat signature, current delay, due, first seen]
+        self.inflight = {}  # path -> True when it was re-created while being processed
+        self.heap = []      # (due, path); entries whose due no longer matches are stale
+        self.cond = threading.Condition()
+        self._running = True
+        self.thread = threading.Thread(target=self._run, name="seiri-events", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def signature(path):
+        try:
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime_ns)
+        except OSError: return None
+
+    def arrived(self, path, renamed=False):
+        # A file showed up at `path`. Renamed-in files (browser rename-on-complete) are
+        # finished already and never report a close, so they only wait out the window.
+        if renamed: delay = CONFIG.seiri_coalesce_window
+        elif self.close_events: delay = CONFIG.seiri_settle_max
+        else: delay = CONFIG.seiri_settle_min
+        with self.cond:
+            if path in self.inflight: self.inflight[path] = True
+            elif path in self.pending: self._touch(path, delay)
+            else:
+                now = time.monotonic()
+                self._schedule(path, self.signature(path), delay, now + delay, now)
+
+    def changed(self, path):
+        with self.cond:
+            if path in self.pending: self._touch(path, CONFIG.seiri_coalesce_window)
+
+    def moved(self, src, dest, keep):
+        with self.cond:
+            self.pending.pop(src, None)
+        if keep: self.arrived(dest, renamed=True)
+
+    def deleted(self, path):
+        with self.cond:
+            self.pending.pop(path, None)
+
+    def closed(self, path):
+        with self.cond:
+            entry = self.pending.pop(path, None)
+            if entry is None: return
+            self.inflight[path] = False
+        METRICS.observe("kaizen_seiri_stage_seconds", time.monotonic() - entry[3], stage="settle")
+        self.on_ready(path)
+
+    def claim(self, path):
+        # For work found outside the event stream (sweeps): False if the path is already handled
+        with self.cond:
+            if path in self.pending or path in self.inflight: return False
+            self.inflight[path] = False
+            return True
+
+    def finished(self, path):
+        with self.cond:
+            again = self.inflight.pop(path, False)
+        if again: self.arrived(path)
+
+    def _schedule(self, path, sig, delay, due, since):
+        self.pending[path] = [sig, delay, due, since]
+        heapq.heappush(self.heap, (due, path))
+        self.cond.notify()
+
+    def _touch(self, path, wait):
+        entry = self.pending[path]
+        due = time.monotonic() + wait
+        if due > entry[2]: self._schedule(path, entry[0], entry[1], due, entry[3])
+
+    def _run(self):
+        while True:
+            ready = []
+            with self.cond:
+                while self._running and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if not self._running: return
+                now = time.monotonic()
+                while self.heap and self.heap[0][0] <= now:
+                    due, path = heapq.heappop(self.heap)
+                    entry = self.pending.get(path)
+                    if entry is None or entry[2] != due: continue  # Released, dropped or pushed back
+                    last, delay, _, since = entry
+                    sig = self.signature(path)
+                    if sig is None: del self.pending[path]
+                    elif sig == last:
+                        del self.pending[path]
+                        self.inflight[path] = False
+                        METRICS.observe("kaizen_seiri_stage_seconds", now - since, stage="settle")
+                        ready.append(path)
+                    else:
+                        delay = min(delay * 2, CONFIG.seiri_settle_max)
+                        self._schedule(path, sig, delay, now + delay, since)
+            for path in ready: self.on_ready(path)
+
+    def stop(self):
+        with self.cond:
+            self._running = False
+            self.pending.clear()
+            self.cond.notify()
+        self.thread.join()
+
+class MoveEngine:
+    # Moves a file onto its reserved target. Same filesystem: a single rename. Across
+    # filesystems: reflink (FICLONE) where the filesystem allows it (e.g. btrfs subvolumes),
+    # else in-kernel copy_file_range/sendfile in large chunks, dropping the copied pages from
+    # the page cache as we go so a multi-GB ISO does not evict the working set. The copy is
+    # written to a hidden partial file, fsynced and renamed into place before the source is
+    # unlinked, so a crash never leaves a truncated file under the real name.
+    FICLONE = 0x40049409
+    CHUNK = 64 * 1024 * 1024
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}  # method -> [moves, bytes, seconds, slowest]
+
+    def move(self, src, dst):
+        src, dst = str(src), str(dst)
+        t = time.perf_counter()
+        size = os.lstat(src).st_size
+        try:
+            os.rename(src, dst)
+            method = "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV: raise
+            if os.path.islink(src):
+                # os.symlink cannot overwrite our placeholder: create it aside and rename it over
+                head, name = os.path.split(dst)
+                partial = os.path.join(head, f".{name}.kaizen-partial")
+                os.symlink(os.readlink(src), partial)
+                try: os.replace(partial, dst)
+                except BaseException:
+                    os.unlink(partial)
+                    raise
+                os.unlink(src)
+                method = "symlink"
+            else: method = self._copy_then_unlink(src, dst, size)
+        self._record(method, size, time.perf_counter() - t)
+        return size
+
+    def _copy_then_unlink(self, src, dst, size):
+        head, name = os.path.split(dst)
+        partial = os.path.join(head, f".{name}.kaizen-partial")
+        sfd = os.open(src, os.O_RDONLY)
+        try:
+            dfd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                method = self._copy(sfd, dfd, size)
+                os.fsync(dfd)
+                self._drop_cache(dfd)
+            finally: os.close(dfd)
+            self._drop_cache(sfd)
+        except BaseException:
+            try: os.unlink(partial)
+            except OSError: pass
+            raise
+        finally: os.close(sfd)
+        shutil.copystat(src, partial)
+        os.replace(partial, dst)
+        dirfd = os.open(head, os.O_RDONLY)
+        try: os.fsync(dirfd)  # The new name is durable before the only other copy goes away
+        finally: os.close(dirfd)
+        os.unlink(src)
+        return method
+
+    def _copy(self, sfd, dfd, size):
+        try:
+            fcntl.ioctl(dfd, self.FICLONE, sfd)
+            return "reflink"
+        except OSError: pass
+        cfr = getattr(os, "copy_file_range", None)
+        for method, fn in (("copy_file_range", cfr), ("sendfile", lambda s, d, n: os.sendfile(d, s, None, n))):
+            if method == "copy_file_range" and cfr is None: continue
+            try:
+                self._copy_chunks(sfd, dfd, size, fn)
+                return method
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP): raise
+                os.ftruncate(dfd, 0)
+                os.lseek(sfd, 0, os.SEEK_SET)
+                os.lseek(dfd, 0, os.SEEK_SET)
+        self._copy_chunks(sfd, dfd, size, self._read_write)
+        return "read_write"
+
+    def _copy_chunks(self, sfd, dfd, size, fn):
+        # fn(src_fd, dst_fd, count) -> bytes copied, advancing both file offsets
+        done = 0
+        while True:
+            n = fn(sfd, dfd, self.CHUNK)
+            if n == 0: break
+            self._drop_cache(sfd, done, n)
+            done += n
+        if done < size: raise OSError(errno.EIO, f"short copy ({done} of {size} bytes)")
+
+    @staticmethod
+    def _read_write(sfd, dfd, count):
+        buf = os.read(sfd, min(count, 1024 * 1024))
+        view, written = memoryview(buf), 0
+        while written < len(buf): written += os.write(dfd, view[written:])
+        return len(buf)
+
+    @staticmethod
+    def _drop_cache(fd, offset=0, length=0):
+        try: os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except (AttributeError, OSError): pass
+
+    def _record(self, method, size, elapsed):
+        with self.lock:
+            s = self.stats.setdefault(method, [0, 0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += size
+            s[2] += elapsed
+            s[3] = max(s[3], elapsed)
+        METRICS.inc("kaizen_seiri_moves_total", method=method)
+
+    def summary(self):
+        with self.lock:
+            return {m: {"moves": n, "bytes": b, "seconds": round(t, 6), "slowest": round(mx, 6),
+                        "mb_per_s": round(b / t / 1e6, 1) if t else 0.0}
+                    for m, (n, b, t, mx) in self.stats.items()}
+
+class MoveJournal:
+    # Append-only JSON-lines log of every file Seiri moves, links or drops. The intent record
+    # ({"op": "intent", src, dst, size, ino, rule}) is durable before the file is touched;
+    # "done"/"abort" follow without waiting. A single writer thread group-commits: whatever
+    # the workers appended while the previous fsync ran goes out in one write + fdatasync,
+    # so a burst costs a handful of syncs rather than one per file.
+    # The file is flock()ed while a service has it open, so `--undo` never races a live watcher.
+    KEEP = 20000  # Finished moves kept for undo when the log is compacted
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = Path(path)
+        self.cond = threading.Condition()
+        self.pending = []   # Encoded lines not yet written
+        self.appended = 0   # Sequence number of the last line appended
+        self.durable = 0    # ...and of the last line known to be on disk
+        self.next_id = 1
+        self.live = {}      # id -> intent record of a move still in progress
+        self.undone = {}    # source path -> (ino, size, mtime_ns) of a file --undo put back there
+        self.fd = None
+        self.thread = None
+        self.closing = False
+
+    def open(self):
+        # -> recovery summary. Raises BlockingIOError if another process holds the journal.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+        try: fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise
+        self.fd = fd
+        summary = self._recover()
+        self.closing = False
+        self.thread = threading.Thread(target=self._write_loop, name="seiri-journal", daemon=True)
+        self.thread.start()
+        return summary
+
+    def close(self):
+        if self.fd is None: return
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        self.thread.join()
+        os.close(self.fd)  # Also drops the flock
+        self.fd = None
+
+    def _append(self, record, wait):
+        if self.fd is None: return  # Not open (another instance holds it): journaling is off
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self.cond:
+            self.pending.append(line)
+            self.appended += 1
+            seq = self.appended
+            self.cond.notify_all()
+            while wait and self.durable < seq and self.thread: self.cond.wait()
+
+    def _write_loop(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closing: self.cond.wait()
+                if not self.pending: return
+                batch, self.pending = self.pending, []
+                upto = self.appended
+            data = b"".join(batch)
+            try:
+                while data: data = data[os.write(self.fd, data):]
+                os.fdatasync(self.fd)
+            except OSError as e: print(f"Linux Journal Error: {e}")  # Keep organizing; the log is best effort then
+            METRICS.inc("kaizen_seiri_journal_syncs_total")
+            METRICS.inc("kaizen_seiri_journal_records_total", len(batch))
+            with self.cond:
+                self.durable = upto
+                self.cond.notify_all()
+
+    def begin(self, kind, src, dst, size, ino, rule):
+        # Blocks until the intent is on disk; returns its id for commit()/abort()
+        record = {"op": "intent", "kind": kind, "src": str(src), "dst": str(dst),
+                  "size": size, "ino": ino, "ts": round(time.time(), 3), "rule": rule}
+        with self.cond:
+            jid = record["id"] = self.next_id
+            self.next_id += 1
+            self.live[jid] = record
+        self._append(record, True)
+        return jid
+
+    def commit(self, jid, ino):
+        with self.cond: self.live.pop(jid, None)
+        self._append({"id": jid, "op": "done", "ino": ino}, False)
+
+    def abort(self, jid, wait=False):
+        with self.cond: self.live.pop(jid, None)
+        self._append({"id": jid, "op": "abort"}, wait)
+
+    def resolve(self, jid):
+        # A shard died in the middle of this move: finish or roll it back now, as recovery would
+        with self.cond: e = self.live.pop(jid, None)
+        if e is None: return
+        state, ino = self._settle(e)
+        self._append({"id": jid, "op": state, "ino": ino} if state == "done" else {"id": jid, "op": state}, False)
+
+    def _read(self):
+        # -> {id: intent record + "state"} in log order. A torn last line (crash mid-write) is skipped.
+        entries = {}
+        try:
+            with open(self.path, "rb") as f: lines = f.read().splitlines()
+        except FileNotFoundError: return entries
+        for line in lines:
+            try: rec = json.loads(line)
+            except ValueError: continue
+            if rec["op"] == "intent": entries[rec["id"]] = dict(rec, state="intent")
+            elif rec["id"] in entries:
+                e = entries[rec["id"]]
+                e["state"] = rec["op"]
+                if rec["op"] == "done": e["done_ino"] = rec.get("ino")
+                elif rec["op"] == "undo": e["undo"] = rec
+        return entries
+
+    def _recover(self):
+        # Finishes or rolls back moves interrupted by a crash, then compacts the log
+        entries = self._read()
+        if entries: self.next_id = max(entries) + 1
+        rolled_forward = rolled_back = 0
+        for e in entries.values():
+            if e["state"] != "intent": continue
+            e["state"], e["done_ino"] = self._settle(e)
+            if e["state"] == "done": rolled_forward += 1
+            else: rolled_back += 1
+        self.undone = {e["src"]: self._identity(e["undo"]) for e in entries.values() if self._still_undone(e)}
+        if rolled_forward or rolled_back or len(entries) > 2 * self.KEEP: self._compact(entries)
+        return {"finished": rolled_forward, "rolled_back": rolled_back}
+
+    def _settle(self, e):
+        # -> ("done", ino at dst) or ("abort", None) for an intent that never finished
+        src, dst = e["src"], e["dst"]
+        src_st, dst_st = self._lstat(src), self._lstat(dst)
+        partial = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.kaizen-partial")
+        try: os.unlink(partial)
+        except OSError: pass
+        if e["kind"] == "drop": landed = src_st is None  # dst is the copy that was already there
+        else: landed = dst_st is not None and dst_st.st_size == e["size"]
+        if landed:
+            # The data reached its destination; at most the source unlink is missing
+            if src_st and e["kind"] != "drop" and (dst_st is None or src_st.st_ino != dst_st.st_ino): os.unlink(src)
+            return "done", dst_st.st_ino if dst_st else None
+        # The source is untouched: remove our placeholder and let the file be organized again
+        if e["kind"] != "drop" and dst_st and dst_st.st_size == 0: os.unlink(dst)
+        return "abort", None
+
+    @staticmethod
+    def _lstat(path):
+        try: return os.lstat(path)
+        except OSError: return None
+
+    @staticmethod
+    def _identity(rec):
+        return rec.get("ino"), rec.get("size"), rec.get("mtime_ns")
+
+    def _still_undone(self, e):
+        # An undone file stays put until it changes (or is replaced): the sweep must not re-sort it
+        if e["state"] != "undo": return False
+        st = self._lstat(e["src"])
+        return st is not None and (st.st_ino, st.st_size, st.st_mtime_ns) == self._identity(e["undo"])
+
+    def is_undone(self, path):
+        # True while `path` is a file --undo restored and nobody has touched since
+        with self.cond: identity = self.undone.get(str(path))
+        if identity is None: return False
+        st = self._lstat(path)
+        if st is not None and (st.st_ino, st.st_size, st.st_mtime_ns) == identity: return True
+        with self.cond: self.undone.pop(str(path), None)
+        return False
+
+    def _compact(self, entries):
+        # Rewrites the log as one line per finished move (the newest KEEP), interrupted ones
+        # resolved; undone moves are kept while their restored file is unchanged
+        done = [e for e in entries.values() if e["state"] == "done"][-self.KEEP:]
+        done += [e for e in entries.values() if self._still_undone(e)]
+        done.sort(key=lambda e: e["id"])
+        lines = []
+        for e in done:
+            rec = {k: v for k, v in e.items() if k not in ("state", "done_ino", "undo")}
+            lines.append(json.dumps(rec, separators=(",", ":")))
+            lines.append(json.dumps({"id": e["id"], "op": "done", "ino": e.get("done_ino")}, separators=(",", ":")))
+            if e["state"] == "undo": lines.append(json.dumps(e["undo"], separators=(",", ":")))
+        atomic_write(self.path, "".join(l + "\n" for l in lines))
+        # atomic_write replaced the file; move our locked descriptor over to the new one
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        os.close(self.fd)
+        self.fd = fd
+
+    def undo(self, count=None, since=None):
+        # Puts the last `count` moves (or all since the unix time `since`) back where they came
+        # from, newest first, using only the log. Files changed since are left alone.
+        self._flush()  # Our own done records may still be queued
+        entries = [e for e in self._read().values() if e["state"] == "done"]
+        if since is not None: entries = [e for e in entries if e["ts"] >= since]
+        if count is not None: entries = entries[-count:] if count > 0 else []
+        restored, skipped = [], []
+        for e in reversed(entries):
+            src, dst = e["src"], e["dst"]
+            try:
+                if os.path.lexists(src): raise FileExistsError(f"{src} exists")
+                if e["kind"] == "drop":
+                    # The download was identical to dst; bring back an independent copy
+                    shutil.copy2(dst, src)
+                else:
+                    if os.lstat(dst).st_ino != e.get("done_ino"): raise ValueError(f"{dst} changed since it was moved")
+                    os.makedirs(os.path.dirname(src), exist_ok=True)
+                    MoveEngine().move(dst, src)
+                st = os.lstat(src)
+                self._append({"id": e["id"], "op": "undo", "ts": round(time.time(), 3), "ino": st.st_ino,
+                              "size": st.st_size, "mtime_ns": st.st_mtime_ns}, False)
+                with self.cond: self.undone[src] = (st.st_ino, st.st_size, st.st_mtime_ns)
+                restored.append((dst, src))
+            except (OSError, ValueError) as err: skipped.append((dst, str(err)))
+        self._flush()
+        return restored, skipped
+
+    def _flush(self):
+        with self.cond:
+            seq = self.appended
+            self.cond.notify_all()
+            while self.durable < seq and self.thread: self.cond.wait()
+
+class SweepReport:
+    # Progress of one backlog sweep; updated by the pool workers
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.scanned = self.queued = self.done = self.moved = self.deferred = 0
+        self.scanning = True
+        self.started = time.monotonic()
+        self.finished = None
+
+    def complete(self, moved):
+        with self.lock:
+            self.done += 1
+            self.moved += bool(moved)
+            self.lock.notify_all()
+
+    def wait(self):
+        with self.lock:
+            while self.scanning or self.done < self.queued: self.lock.wait()
+            if self.finished is None: self.finished = time.monotonic()
+
+    def rate(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.moved / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return (f"{self.moved}/{self.queued} files organized ({self.scanned} scanned, {self.deferred} still settling) "
+                f"in {elapsed:.2f}s, {self.rate():.0f} files/s")
+
+class ConfigFileHandler(EventHandler):
+    # Fires `callback` shortly after CONFIG_FILE changes on disk (saves replace it atomically,
+    # so we see a move onto it; editors may also write in place)
+    def __init__(self, callback, delay=0.25):
+        self.callback = callback
+        self.delay = delay
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def on_any_event(self, event):
+        if str(CONFIG_FILE) not in (event.src_path, getattr(event, "dest_path", "")): return
+        if event.event_type not in ("created", "modified", "moved", "closed"): return
+        with self.lock:
+            if self.timer: self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.callback)
+            self.timer.daemon = True
+            self.timer.start()
+
+def mount_fstype(path):
+    # Filesystem type of the mount holding `path` (the longest mount point above it), or None
+    path, best, fstype = os.path.realpath(path), None, None
+    try:
+        with open(MOUNTINFO) as f:
+            for line in f:
+                fields = line.split()
+                point = re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), fields[4])  # "\040" is a space
+                if path != point and not path.startswith(os.path.join(point, "")): continue
+                if best is None or len(point) >= len(best):  # >=: later mounts stack over earlier ones
+                    best, fstype = point, fields[fields.index("-") + 1]
+    except (OSError, ValueError, IndexError): return None
+    return fstype
+
+def needs_polling(path):
+    # -> the filesystem type when `path` should be polled rather than watched, else None
+    mode = CONFIG.seiri_poll
+    if mode == "never": return None
+    fstype = mount_fstype(path) or "unknown"
+    if mode == "always" or fstype in NETWORK_FS or fstype.startswith("fuse."): return fstype
+    return None
+
+PollEvent = collections.namedtuple("PollEvent", "event_type src_path dest_path is_directory")
+M64 = (1 << 64) - 1
+
+class PollWatch:
+    # One polled folder. entries: name -> ino << 128 | size << 64 | mtime_ns, one int per entry
+    # (a third of an (ino, size, mtime) tuple). The first listing records inodes only: files
+    # already there are the start-up sweep's business, so they are never stat()ed.
+    __slots__ = ("handler", "path", "entries", "dirs", "mtime", "confirmed", "interval", "active")
+
+    def __init__(self, handler, path):
+        self.handler, self.path = handler, path
+        self.entries = None
+        self.dirs = set()
+        self.mtime = None
+        self.confirmed = False
+        self.interval = CONFIG.seiri_poll_min
+        self.active = True
+
+class DirectoryPoller:
+    # Stands in for the observer on folders inotify cannot see into (writes by other hosts to
+    # an NFS/SMB share or through a FUSE daemon raise no local events). One thread polls them
+    # all. While a folder's mtime is unchanged nothing was added, removed or renamed in it and
+    # a poll is a single stat(); otherwise it is one scandir pass that stats only new names and
+    # files still being written. Quiet folders are polled half as often each time, down to
+    # seiri_poll_max; polls at that interval always list, since NFS clients cache folder
+    # attributes for up to a minute. Same schedule()/unschedule() shape as the observer.
+    def __init__(self):
+        self.heap = []  # (due, id, PollWatch)
+        self.cond = threading.Condition()
+        self.thread = None
+        self._running = True
+
+    def schedule(self, handler, path, recursive=False):
+        w = PollWatch(handler, path)
+        with self.cond:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="seiri-poll", daemon=True)
+                self.thread.start()
+            heapq.heappush(self.heap, (time.monotonic(), id(w), w))  # Baseline listing right away
+            self.cond.notify()
+        return w
+
+    def unschedule(self, w):
+        w.active = False
+
+    def stop(self):
+        with self.cond:
+            self._running = False
+            self.cond.notify()
+        if self.thread: self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self._running and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if not self._running: return
+                _, _, w = heapq.heappop(self.heap)
+            if not w.active: continue
+            t = time.perf_counter()
+            try: changed = self.poll(w)
+            except Exception as e:
+                print(f"Linux Poll Error: {e}")
+                changed = False
+            METRICS.lap("poll", t)
+            w.interval = CONFIG.seiri_poll_min if changed else min(w.interval * 2, CONFIG.seiri_poll_max)
+            with self.cond: heapq.heappush(self.heap, (time.monotonic() + w.interval, id(w), w))
+
+    def poll(self, w):
+        # -> True when anything changed; events go straight to the handler
+        try: mtime = os.stat(w.path).st_mtime_ns
+        except OSError: return False  # Gone or unreachable; its parent reports a deletion
+        if mtime == w.mtime and w.confirmed and w.interval < CONFIG.seiri_poll_max:
+            METRICS.inc("kaizen_seiri_polls_total", result="unchanged")
+            return False
+        # A change in the same mtime tick as our listing shows up in the next one, so an
+        # mtime is only trusted once two listings agree on it
+        w.confirmed, w.mtime = mtime == w.mtime, mtime
+        METRICS.inc("kaizen_seiri_polls_total", result="listed")
+        baseline, old = w.entries is None, w.entries or {}
+        entries, dirs, created, modified = {}, set(), [], []
+        recent = time.time_ns() - int(CONFIG.seiri_settle_max * 1e9)
+        try:
+            with os.scandir(w.path) as it:
+                for e in it:
+                    name, ino = e.name, e.inode()
+                    prev = old.get(name)
+                    same = prev is not None and prev >> 128 == ino
+                    if e.is_dir(follow_symlinks=False):
+                        dirs.add(name)
+                        entries[name] = ino << 128
+                        if not same: created.append(name)
+                        continue
+                    if baseline:
+                        entries[name] = ino << 128
+                        continue
+                    if same and prev & M64 < recent:
+                        entries[name] = prev  # Settled and still the same file: no stat
+                        continue
+                    try: st = e.stat(follow_symlinks=False)
+                    except OSError: continue
+                    entries[name] = v = ino << 128 | (st.st_size & M64) << 64 | (st.st_mtime_ns & M64)
+                    if not same: created.append(name)
+                    elif v != prev: modified.append(name)
+        except OSError: return False
+        old_dirs, w.entries, w.dirs = w.dirs, entries, dirs
+        if baseline: return False
+
+        gone = [n for n in old if n not in entries or entries[n] >> 128 != old[n] >> 128]
+        by_ino = {old[n] >> 128: n for n in gone}
+        renamed = {}  # new name -> old name: same inode under a new name
+        for n in created:
+            src = by_ino.pop(entries[n] >> 128, None)
+            if src is not None: renamed[n] = src
+        join, dispatch = os.path.join, w.handler.dispatch
+        for n, src in renamed.items(): dispatch(PollEvent("moved", join(w.path, src), join(w.path, n), n in dirs))
+        for n in by_ino.values(): dispatch(PollEvent("deleted", join(w.path, n), "", n in old_dirs))
+        for n in created:
+            if n not in renamed: dispatch(PollEvent("created", join(w.path, n), "", n in dirs))
+        for n in modified: dispatch(PollEvent("modified", join(w.path, n), "", False))
+        return bool(created or gone or modified)
+
+def max_user_watches():
+    try:
+        with open(MAX_USER_WATCHES) as f: return int(f.read())
+    except (OSError, ValueError): return None
+
+class WatchTree:
+    # The watched folders. Each watch path is scheduled once, non-recursively; with
+    # seiri_recursive its subfolders are added to that same inotify instance one by one,
+    # filtered by depth/include/exclude before a watch is spent on them (watchdog's own
+    # recursive mode watches every folder under the root, up front). New subfolders are
+    # registered as they appear and swept, since files can land in them before their watch.
+    # Registration runs on one background thread; on_watched(dirs, initial) gets each batch.
+    # Watch paths on network/FUSE mounts go to the DirectoryPoller instead, subfolders included.
+    def __init__(self, observer, poller, handler, on_watched):
+        self.observer, self.poller, self.handler = observer, poller, handler
+        self.on_watched = on_watched
+        self.roots = {}    # watch path -> ObservedWatch or PollWatch
+        self.subdirs = {}  # watch path -> {subfolder: wd in the root's inotify, or its own ObservedWatch/PollWatch}
+        self.polled = {}   # watch path -> filesystem type, for the polled ones
+        self.lock = threading.RLock()
+        self.jobs = queue.Queue()
+        self.thread = None
+        self.limit = max_user_watches()
+        self.warned = False
+        self.compile()
+
+    def compile(self):
+        self.recursive = bool(CONFIG.seiri_recursive)
+        self.max_depth = int(CONFIG.seiri_max_depth or 0)
+        self.exclude = [re.compile(fnmatch.translate(g)) for g in CONFIG.seiri_exclude]
+        self.include = [re.compile(fnmatch.translate(g)) for g in CONFIG.seiri_include]
+        # Category folders are never watched: everything in them was just organized
+        self.dests = {str(Path.home() / "Desktop" / c) for c in CONFIG.extensions}
+        self.dests |= {str(r.dest) for r in self.handler.rules.rules}
+        self.budget = CONFIG.seiri_max_watches or (self.limit // 2 if self.limit else None)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="seiri-tree", daemon=True)
+        self.thread.start()
+        for root in list(self.roots): self.jobs.put(("expand", root, True))
+        self.jobs.put(("report",))
+
+    def stop(self):
+        if self.thread: self.jobs.put(None)
+
+    def sync(self, wanted):
+        # Schedules/unschedules only the watch paths that differ from what is running
+        with self.lock:
+            removed = [p for p in self.roots if p not in wanted]
+            added = [p for p in wanted if p not in self.roots]
+            for p in removed:
+                backend = self._backend(p)
+                for watch in self.subdirs.pop(p).values():
+                    if not isinstance(watch, int): backend.unschedule(watch)
+                backend.unschedule(self.roots.pop(p))  # Closes its inotify, sub-watches included
+                self.polled.pop(p, None)
+            for p in added:
+                fstype = needs_polling(p)
+                if fstype: self.polled[p] = fstype
+                self.roots[p] = self._backend(p).schedule(self.handler, p, recursive=False)
+                self.subdirs[p] = {}
+                METRICS.gauge("kaizen_seiri_watches", lambda p=p: 1 + len(self.subdirs[p]), path=p)
+                METRICS.gauge("kaizen_seiri_watch_kernel_bytes", lambda p=p: self._kernel_bytes(p), path=p)
+                if self.thread: self.jobs.put(("expand", p, True))
+        return added, removed
+
+    def refresh(self):
+        # Filters changed: re-walk every root and add/remove the difference
+        self.compile()
+        for root in list(self.roots): self.jobs.put(("expand", root, False))
+
+    def created(self, path):
+        if self.recursive: self.jobs.put(("grow", path))
+
+    def deleted(self, path):
+        if self.recursive: self.jobs.put(("drop", path))
+
+    def dirs(self):
+        with self.lock: return list(self.roots) + [d for subs in self.subdirs.values() for d in subs]
+
+    def count(self):
+        # inotify watches in use (polled folders take none)
+        with self.lock: return sum(1 + len(self.subdirs[p]) for p in self.roots if p not in self.polled)
+
+    def report(self):
+        # -> [(watch path, folders, estimated kernel bytes, filesystem type if polled)]
+        with self.lock: return [(p, 1 + len(self.subdirs[p]), self._kernel_bytes(p), self.polled.get(p)) for p in self.roots]
+
+    def _kernel_bytes(self, root):
+        return 0 if root in self.polled else (1 + len(self.subdirs[root])) * WATCH_KERNEL_BYTES
+
+    def _backend(self, root):
+        return self.poller if root in self.polled else self.observer
+
+    def _run(self):
+        while (job := self.jobs.get()) is not None:
+            try:
+                if job[0] == "expand": self._expand(job[1], job[2])
+                elif job[0] == "grow": self._grow(job[1])
+                elif job[0] == "drop": self._drop(job[1])
+                else:
+                    for p, n, size, fstype in self.report():
+                        if fstype: print(f"Seiri polling {p} ({fstype}): {n} folders")
+                        else: print(f"Seiri watching {p}: {n} folders, ~{size // 1024} KiB kernel memory")
+                    if self.limit: print(f"Seiri watches: {self.count()} of {self.limit} (fs.inotify.max_user_watches)")
+            except Exception as e: print(f"Linux Watch Error: {e}")
+
+    def _root_of(self, path):
+        with self.lock: roots = [r for r in self.roots if path.startswith(os.path.join(r, ""))]
+        return max(roots, key=len) if roots else None
+
+    def _excluded(self, name, rel):
+        return any(p.match(name) or p.match(rel) for p in self.exclude)
+
+    def _included(self, rel):
+        # A folder is watched if it or one of its parents matches an include glob
+        if not self.include: return True
+        while rel:
+            if any(p.match(rel) for p in self.include): return True
+            rel = os.path.dirname(rel)
+        return False
+
+    def _allowed(self, root, rel):
+        parts = rel.split(os.sep)
+        if self.max_depth and len(parts) > self.max_depth: return False
+        for i, name in enumerate(parts):
+            sub = os.sep.join(parts[:i + 1])
+            if self._excluded(name, sub) or os.path.join(root, sub) in self.dests: return False
+        return True
+
+    def _walk(self, root, top):
+        # Folders from `top` down (top itself unless it is the root) that pass the filters.
+        # Excluded, too-deep, destination and symlinked folders are not even listed.
+        if top == root: stack = [(root, "", 0)]
+        else:
+            rel = os.path.relpath(top, root)
+            if not self._allowed(root, rel): return []
+            stack = [(top, rel, rel.count(os.sep) + 1)]
+        found = []
+        while stack:
+            path, rel, depth = stack.pop()
+            if depth and self._included(rel): found.append(path)
+            if self.max_depth and depth >= self.max_depth: continue
+            try:
+                with os.scandir(path) as it:
+                    for e in it:
+                        if not e.is_dir(follow_symlinks=False): continue
+                        sub = os.path.join(rel, e.name) if rel else e.name
+                        if self._excluded(e.name, sub) or e.path in self.dests or e.path in self.roots: continue
+                        stack.append((e.path, sub, depth + 1))
+            except OSError: continue
+        return found
+
+    def _expand(self, root, initial):
+        if root not in self.roots: return
+        wanted = set(self._walk(root, root)) if self.recursive else set()
+        with self.lock: current = set(self.subdirs.get(root, ()))
+        for path in current - wanted: self._remove(root, path)
+        self._watched(self._add_all(root, sorted(wanted - current)), initial)
+
+    def _grow(self, path):
+        root = self._root_of(path)
+        if root is None or path in self.roots: return
+        with self.lock: known = self.subdirs[root]
+        self._watched(self._add_all(root, [d for d in self._walk(root, path) if d not in known]), False)
+
+    def _drop(self, path):
+        # The folder was deleted or moved away: forget it and everything below it
+        prefix = os.path.join(path, "")
+        with self.lock: gone = [(r, d) for r, subs in self.subdirs.items() for d in subs if d == path or d.startswith(prefix)]
+        for root, d in gone: self._remove(root, d)
+
+    def _watched(self, dirs, initial):
+        if dirs: self.on_watched(dirs, initial)
+
+    def _add_all(self, root, paths):
+        added = []
+        for path in paths:
+            if self.budget and self.count() >= self.budget:
+                self._warn(f"{self.budget} watches in use")
+                break
+            try: self._add(root, path)
+            except OSError as e:
+                if e.errno != errno.ENOSPC: continue  # Vanished or unreadable folder
+                self._warn("fs.inotify.max_user_watches reached")
+                break
+            added.append(path)
+        return added
+
+    def _warn(self, why, fix="raise the limit, or narrow seiri_include/seiri_exclude/seiri_max_depth"):
+        if self.warned: return
+        self.warned = True
+        print(f"Linux Watch Error: {why}; further subfolders are not watched ({fix})")
+
+    def _inotify(self, root):
+        # The watchdog Inotify object behind a root's watch, or None on other backends.
+        # Its emitter thread creates it, so it may take a moment to appear after start().
+        emitter = getattr(self.observer, "_emitter_for_watch", {}).get(self.roots.get(root))
+        if emitter is None or not hasattr(emitter, "_inotify"): return None
+        deadline = time.monotonic() + 2.0
+        while emitter._inotify is None and emitter.is_alive() and time.monotonic() < deadline: time.sleep(0.01)
+        return getattr(emitter._inotify, "_inotify", None)
+
+    def _add(self, root, path):
+        ino = self._inotify(root)
+        if ino is not None and all(hasattr(ino, a) for a in ("_lock", "_add_watch", "_event_mask", "fd")):
+            with ino._lock: watch = ino._add_watch(os.fsencode(path), ino._event_mask)  # -> wd
+        elif root not in self.polled and type(self.observer).__name__ == "InotifyObserver":
+            # A watch of its own would cost an inotify instance and a thread per folder, and
+            # max_user_instances (128 by default) runs out long before max_user_watches
+            self._warn(f"watchdog {self._watchdog_version()} does not expose the inotify internals "
+                       "recursive watching needs", "install the version range in requirements.txt")
+            return
+        else: watch = self._backend(root).schedule(self.handler, path, recursive=False)
+        with self.lock:
+            if root in self.subdirs:
+                self.subdirs[root][path] = watch
+                return
+        self._release(root, watch)  # Root unscheduled meanwhile
+
+    @staticmethod
+    def _watchdog_version():
+        try:
+            from watchdog.version import VERSION_STRING
+            return VERSION_STRING
+        except ImportError: return "unknown"
+
+    def _remove(self, root, path):
+        with self.lock:
+            subs = self.subdirs.get(root)
+            if subs is None or path not in subs: return
+            watch = subs.pop(path)
+        self._release(root, watch)
+
+    def _release(self, root, watch):
+        if not isinstance(watch, int):
+            (self.poller if isinstance(watch, PollWatch) else self.observer).unschedule(watch)
+            return
+        ino = self._inotify(root)
+        if ino is None: return
+        from watchdog.observers.inotify_c import inotify_rm_watch
+        # Only the kernel watch is removed, by wd (a moved folder's watch follows it to its new
+        # name); watchdog drops its own bookkeeping when the resulting IN_IGNORED arrives, which
+        # Inotify.remove_watch() would turn into a KeyError. A deleted folder's watch is already
+        # gone and this is a harmless EINVAL.
+        inotify_rm_watch(ino.fd, watch)
+
+# --- SHARDS (seiri_processes > 1) ---
+class Channel:
+    # Calls both ways over one multiprocessing Connection between the organizer and a shard.
+    # call() blocks for the reply, notify() does not. Incoming calls run on `pool` (they may
+    # block, and the reader must stay free to deliver replies); notifications run inline.
+    def __init__(self, conn, pool, methods, on_close=None):
+        self.conn, self.pool, self.methods = conn, pool, methods
+        self.on_close = on_close
+        self.send_lock = threading.Lock()
+        self.waiting = {}  # call id -> [Event, result, error]
+        self.ids = itertools.count()
+        self.closed = False
+        self.reader = threading.Thread(target=self._read, name="seiri-channel", daemon=True)
+
+    def start(self):
+        self.reader.start()
+        return self
+
+    def _send(self, msg):
+        with self.send_lock: self.conn.send(msg)
+
+    def call(self, method, *args):
+        slot = [threading.Event(), None, None]
+        i = next(self.ids)
+        self.waiting[i] = slot
+        if self.closed:  # After registering: the reader fails whatever it finds once closed is set
+            self.waiting.pop(i, None)
+            raise EOFError("shard channel closed")
+        try: self._send(("call", i, method, args))
+        except OSError:  # Peer gone before the reader noticed
+            self.waiting.pop(i, None)
+            raise EOFError("shard channel closed")
+        slot[0].wait()
+        if slot[2] is not None: raise slot[2]
+        return slot[1]
+
+    def notify(self, method, *args):
+        try: self._send(("call", None, method, args))
+        except OSError: pass  # Peer gone; its side is shutting down anyway
+
+    def _read(self):
+        while True:
+            try: msg = self.conn.recv()
+            except (EOFError, OSError): break
+            if msg[0] == "reply":
+                slot = self.waiting.pop(msg[1], None)
+                if slot:
+                    slot[1], slot[2] = msg[2], msg[3]
+                    slot[0].set()
+            elif msg[1] is None: self._serve(*msg[1:])
+            else: self.pool.submit(self._serve, *msg[1:])
+        self.closed = True
+        for slot in list(self.waiting.values()):
+            slot[2] = EOFError("shard channel closed")
+            slot[0].set()
+        self.waiting.clear()
+        if self.on_close: self.on_close()
+
+    def _serve(self, i, method, args):
+        try: result, error = self.methods[method](*args), None
+        except Exception as e:
+            if i is None:
+                print(f"Linux Shard Error: {method}: {e}")
+                return
+            result, error = None, e if isinstance(e, OSError) else RuntimeError(f"{type(e).__name__}: {e}")
+        if i is None: return
+        try: self._send(("reply", i, result, error))
+        except OSError: pass
+
+class ParentLink:
+    # A shard's stand-in for the parent's NameIndex, MoveJournal and GUI queue, so the
+    # FileHandler pipeline runs unchanged in a shard process
+    def __init__(self, channel): self.channel = channel
+    def reserve_for(self, journal, dest, stem, suffix, kind, src, size, ino, rule):
+        target, jid = self.channel.call("reserve_for", str(dest), stem, suffix, kind, str(src), size, ino, rule)
+        return Path(target), jid
+    def release(self, target): self.channel.notify("release", str(target))
+    def begin(self, kind, src, dst, size, ino, rule): return self.channel.call("begin", kind, str(src), str(dst), size, ino, rule)
+    def commit(self, jid, ino): self.channel.notify("commit", jid, ino)
+    def abort(self, jid): self.channel.notify("abort", jid)
+    def put(self, msg): self.channel.notify("gui", msg)
+    def stat(self, key, n=1): self.channel.notify("stat", key, n)
+    def watch(self, dest): self.channel.notify("watch", dest)
+    def placed(self, path): self.channel.notify("placed", path)
+
+    @contextlib.contextmanager
+    def hold(self, *key):
+        # DuplicateIndex locks live in the parent so they cover every shard. "placed" goes out
+        # before "unhold", so the next holder's shard has the new file indexed by then.
+        self.channel.call("hold", *key)
+        try: yield
+        finally: self.channel.notify("unhold", *key)
+
+class ShardSet:
+    # seiri_processes organizer processes fed by this one, which keeps the watches, the
+    # settle logic, name reservation, the journal and the stats. process() routes a settled
+    # file by a hash of its own path (seiri_shard = "file") or by its watch path ("path") and
+    # blocks until that shard is done with it. Destination changes are broadcast so every
+    # shard's DuplicateIndex stays current; each shard saves its own when it stops.
+    # What a shard has in flight here (journal intents, which cover its placeholders, and
+    # duplicate locks) is tracked, so if it dies its moves are settled and its locks freed
+    # before a retry.
+    def __init__(self, count, names, journal, gui_queue, on_watch):
+        self.count = count
+        self.names, self.journal = names, journal
+        self.pool = WorkerPool((CONFIG.seiri_workers + CONFIG.seiri_bulk_workers) * count, 1 << 20)  # Serves the shards' calls
+        self.methods = {
+            "gui": gui_queue.put, "stat": CONFIG.increment_stat, "watch": on_watch,
+            "placed": lambda path: self._broadcast("note", path),
+        }
+        self.locks = KeyedLocks()
+        self.lock = threading.Lock()
+        self.inflight_lock = threading.Lock()
+        self.roots = {}  # watch path -> shard
+        self.shards = [self._spawn(i) for i in range(count)]
+
+    def _spawn(self, i):
+        import socket
+        import subprocess
+        from multiprocessing.connection import Connection
+        ours, theirs = socket.socketpair()
+        proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--shard", str(theirs.fileno())],
+                                pass_fds=(theirs.fileno(),))
+        theirs.close()
+        names, journal, guard = self.names, self.journal, self.inflight_lock
+        held = collections.Counter()  # Duplicate locks
+        intents = set()               # Journal ids of its unfinished moves (and placeholders)
+        gone = []
+
+        # Calls still running when the shard died are undone as soon as they return
+        def reserve_for(dest, stem, suffix, kind, src, size, ino, rule):
+            target, jid = names.reserve_for(journal, dest, stem, suffix, kind, src, size, ino, rule)
+            if track(jid): return str(target), jid
+
+        def begin(kind, src, dst, size, ino, rule):
+            jid = journal.begin(kind, src, dst, size, ino, rule)
+            if track(jid): return jid
+
+        def track(jid):
+            with guard:
+                if not gone:
+                    intents.add(jid)
+                    return True
+            journal.resolve(jid)
+            return False
+
+        def end(jid):
+            with guard: intents.discard(jid)
+
+        def hold(*key):
+            self.locks.acquire(key)
+            with guard:
+                if not gone:
+                    held[key] += 1
+                    return
+            self.locks.release(key)
+
+        def unhold(*key):
+            with guard: held[key] -= 1
+            self.locks.release(key)
+
+        def closed():
+            with guard:
+                gone.append(True)
+                keys, jids = list(held.elements()), list(intents)
+            for jid in jids: journal.resolve(jid)  # Also removes a placeholder nothing was moved onto
+            for key in keys: self.locks.release(key)
+
+        methods = dict(self.methods, reserve_for=reserve_for, release=names.release, begin=begin, hold=hold, unhold=unhold,
+                       commit=lambda jid, ino: (end(jid), journal.commit(jid, ino)),
+                       abort=lambda jid: (end(jid), journal.abort(jid)),
+                       metrics=lambda snapshot: METRICS.absorb(str(i), snapshot))
+        return proc, Channel(Connection(ours.detach()), self.pool, methods, on_close=closed).start()
+
+    def process(self, path):
+        i = self._root_shard(path) if CONFIG.seiri_shard == "path" else hash(path) % self.count
+        channel = self._shard(i)
+        try: return channel.call("process", path)
+        except EOFError:
+            # Died mid-call. Once its reader is done, whatever it was moving is settled and a
+            # fresh shard finds the file either still here or gone.
+            channel.reader.join()
+            return self._shard(i).call("process", path)
+
+    def _shard(self, i):
+        proc, channel = self.shards[i]
+        if channel.closed:
+            with self.lock:
+                proc, channel = self.shards[i]
+                if channel.closed:
+                    channel.reader.join()
+                    print(f"Linux Shard Error: shard {i} exited with {proc.poll()}, restarting it")
+                    proc, channel = self.shards[i] = self._spawn(i)
+        return channel
+
+    def _root_shard(self, path):
+        root = watch_root(path)
+        with self.lock: return self.roots.setdefault(root, len(self.roots) % self.count)  # Round-robin by first use
+
+    def _broadcast(self, method, *args):
+        for _, channel in self.shards: channel.notify(method, *args)
+
+    def note(self, path): self._broadcast("note", path)
+    def discard(self, path): self._broadcast("discard", path)
+    def reconfigure(self): self._broadcast("reconfigure")
+    def save(self): pass
+
+    def stop(self):
+        import subprocess
+        self._broadcast("stop")
+        for proc, channel in self.shards:
+            try: proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+            channel.reader.join(timeout=5)  # Its last metrics snapshot comes right before EOF
+        self.pool.shutdown()
+
+class AutomationService:
+    def __init__(self, gui_queue):
+        self.gui_queue = gui_queue
+        self.observer = None
+        self.pool = None
+        self.tree = None
+        self._is_running = False
+        self._reconfig_lock = threading.Lock()
+        CONFIG.load()
+        self.metrics_server = serve_metrics()
+        METRICS.gauge("kaizen_seiri_queue_depth", lambda: self.pool.depth() if self.pool else 0)
+        for lane in ("fast", "bulk"):
+            METRICS.gauge("kaizen_seiri_lane_depth", lambda lane=lane: self.pool.lanes[lane].depth if self.pool else 0, lane=lane)
+        METRICS.gauge("kaizen_seiri_pending_files", lambda: len(self.events.pending) if self.pool else 0)
+
+    def start_watching(self):
+        from watchdog.observers import Observer
+        if self._is_running: self.stop_watching()
+        self.observer = Observer()
+        self.names = NameIndex(on_seed=self._watch_destination)
+        self.journal = MoveJournal()
+        try:
+            recovered = self.journal.open()
+            if any(recovered.values()):
+                print(f"Seiri journal: {recovered['finished']} interrupted moves finished, {recovered['rolled_back']} rolled back")
+        except OSError as e: print(f"Linux Journal Error: {JOURNAL_FILE} unavailable, moves are not journaled ({e})")
+        processes = max(1, int(CONFIG.seiri_processes))
+        if processes > 1:
+            # Moves happen in the shard processes; this one only waits on them, one thread per slot
+            self.shards = self.dedup = ShardSet(processes, self.names, self.journal, self.gui_queue, self._watch_destination)
+        else:
+            self.shards = None
+            self.dedup = DuplicateIndex(on_seed=self._watch_destination)  # Scheduling a watch twice is a no-op
+        self.pool = LanePool(CONFIG.seiri_workers * processes, CONFIG.seiri_bulk_workers * processes, CONFIG.seiri_queue_size)
+        self.dest_handler = DestinationHandler(self.names, self.dedup)
+        self.handler = handler = FileHandler(self.gui_queue, self.pool, ExtensionIndex(CONFIG.extensions),
+                                              RuleSet(CONFIG.seiri_rules), self.names, self.dedup, self.journal)
+        handler.shards = self.shards
+        # Only the inotify backend reports IN_CLOSE_WRITE; others rely on stat probing alone
+        self.events = EventCoalescer(handler.dispatch_ready, Observer.__name__ == "InotifyObserver")
+        handler.events = self.events
+        self.poller = DirectoryPoller()
+        self.tree = handler.tree = WatchTree(self.observer, self.poller, handler, self._subdirs_watched)
+        
+        valid = len(self._sync_watches()[0])
+        if self.shards and CONFIG.seiri_shard == "path" and valid < processes:
+            print(f"Seiri: seiri_shard is \"path\" but there are only {valid} watch path(s) for {processes} processes; "
+                  f"the rest stay idle (\"file\" spreads files over all of them)")
+        
+        if valid > 0:
+            self.observer.schedule(ConfigFileHandler(self.reconfigure), str(CONFIG_FILE.parent), recursive=False)
+            self.observer.start()
+            self._is_running = True
+            self.tree.start()  # Subfolders are registered (and swept) in the background
+            if CONFIG.seiri_sweep_on_start: self.sweep()
+        else:
+            self.events.stop()
+            self.pool.shutdown()
+            self.pool = None
+            if self.shards: self.shards.stop()
+            self.journal.close()
+
+    def stop_watching(self):
+        if self._is_running and self.observer:
+            self.tree.stop()
+            self.poller.stop()
+            self.observer.stop()
+            self.observer.join()
+            self.events.stop()
+            self.pool.shutdown()
+            self.pool = None
+            if self.shards: self.shards.stop()  # After the pool: nothing is in flight any more
+            self.journal.close()
+            self.dedup.save()
+            self._is_running = False
+
+    def _sync_watches(self):
+        # Schedules/unschedules only the watch paths that differ from what is running
+        return self.tree.sync({p for p in CONFIG.watch_paths if os.path.isdir(p)})
+
+    def _subdirs_watched(self, dirs, initial):
+        # Files may have landed in a new folder before its watch did
+        if not initial or CONFIG.seiri_sweep_on_start: self.sweep(dirs)
+
+    def reconfigure(self):
+        # Applies on-disk config changes to the running watcher: same observer, same pool,
+        # same dispatcher; moves already in flight keep the rules they started with.
+        with self._reconfig_lock:
+            changed = CONFIG.reload()
+            if not changed: return changed
+            if not self._is_running:
+                if "watch_paths" in changed: self.start_watching()
+                return changed
+            if "seiri_processes" in changed:
+                self.start_watching()  # New process layout: restart the pipeline
+                return changed
+            if self.shards: self.shards.reconfigure()  # Each shard re-reads the file itself
+            if "extensions" in changed:
+                self.handler.index = ExtensionIndex(CONFIG.extensions)  # Atomic swap
+            if "seiri_rules" in changed: self.handler.rules = RuleSet(CONFIG.seiri_rules)
+            if changed & {"seiri_recursive", "seiri_max_depth", "seiri_include", "seiri_exclude",
+                          "seiri_max_watches", "extensions", "seiri_rules"}:
+                self.tree.refresh()
+            if "seiri_poll" in changed:
+                self.tree.sync(set())  # Every watch path may switch between inotify and polling
+            if changed & {"watch_paths", "seiri_poll"}:
+                added, removed = self._sync_watches()
+                if added and CONFIG.seiri_sweep_on_start: self.sweep(added)
+            if changed & {"seiri_workers", "seiri_bulk_workers"}:
+                n = self.shards.count if self.shards else 1
+                self.pool.resize(CONFIG.seiri_workers * n, CONFIG.seiri_bulk_workers * n)
+            print(f"Seiri reconfigured: {', '.join(sorted(changed))}")
+            return changed
+
+    def sweep(self, paths=None):
+        # Feed files already sitting in the watch paths through the normal move pipeline.
+        # Runs in the background; the returned report can be polled or waited on.
+        if not self._is_running: return None
+        report = SweepReport()
+        threading.Thread(target=self._sweep, args=(list(paths or self.tree.dirs()), report),
+                         name="seiri-sweep", daemon=True).start()
+        return report
+
+    def _sweep(self, paths, report):
+        pool, handler = self.pool, self.handler
+        recent = time.time() - CONFIG.seiri_settle_max
+
+        def settle(path):
+            moved = False
+            try: moved = handler.process_once(path)
+            finally: report.complete(moved)  # Even if it raised, or report.wait() never returns
+
+        try:
+            for p in paths:
+                try:
+                    with os.scandir(p) as it: entries = [e for e in it if e.is_file(follow_symlinks=False)]
+                except OSError as e:
+                    print(f"Linux Sweep Error: {e}")
+                    continue
+                report.scanned += len(entries)
+                for e in entries:
+                    if self.pool is not pool: return  # Watcher stopped mid-sweep
+                    if e.name.endswith(TEMP_SUFFIXES) or not handler.wanted(e.name): continue
+                    if self.journal.is_undone(e.path): continue  # Put back by --undo; left alone until it changes
+                    try: fresh = e.stat().st_mtime > recent
+                    except OSError: continue
+                    if fresh:
+                        # Possibly still being written: let the completion detector release it
+                        self.events.arrived(e.path)
+                        report.deferred += 1
+                        continue
+                    if not self.events.claim(e.path): continue
+                    with report.lock: report.queued += 1
+                    pool.submit(settle, e.path)
+        finally:
+            with report.lock:
+                report.scanning = False
+                report.lock.notify_all()
+        if self.pool is not pool: return
+        report.wait()
+        if report.queued or report.deferred: print(f"Seiri sweep: {report}")
+        if report.moved: self.gui_queue.put(("notify", f"Kaizen: swept {report.moved} files ({report.rate():.0f}/s)"))
+
+    def _watch_destination(self, dest):
+        try: self.observer.schedule(self.dest_handler, dest, recursive=False)
+        except Exception as e:
+            self.names.invalidate(dest)  # Unwatched folders must not be trusted; reseed next time
+            print(f"Linux Watch Error: {e}")
+
+class FileHandler(EventHandler):
+    def __init__(self, gui_queue, pool, index, rules, names, dedup, journal):
+        self.gui_queue = gui_queue
+        self.pool = pool
+        self.index = index
+        self.rules = rules
+        self.names = names
+        self.dedup = dedup
+        self.journal = journal
+        self.mover = MoveEngine()
+        self.sniffer = ContentSniffer()
+        self.events = None
+        self.tree = None
+        self.shards = None
+
+    def dispatch(self, event):
+        METRICS.inc("kaizen_seiri_events_total", type=event.event_type)
+        super().dispatch(event)
+
+    def on_created(self, event):
+        if event.is_directory:
+            self.tree.created(event.src_path)
+            return
+        if event.src_path.endswith(TEMP_SUFFIXES): return
+        self.events.arrived(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory: self.events.changed(event.src_path)
+
+    def on_moved(self, event):
+        # Browsers write to .part/.crdownload and rename to the final name when done
+        if event.is_directory:
+            self.tree.deleted(event.src_path)
+            self.tree.created(event.dest_path)
+            return
+        self.events.moved(event.src_path, event.dest_path, not event.dest_path.endswith(TEMP_SUFFIXES))
+
+    def on_deleted(self, event):
+        if event.is_directory: self.tree.deleted(event.src_path)
+        else: self.events.deleted(event.src_path)
+
+    def on_closed(self, event):
+        if not event.is_directory: self.events.closed(event.src_path)
+
+    def wanted(self, name):
+        # Cheap name-only pre-filter (sweeps): could a rule, an extension or sniffing place it?
+        if self.rules.may_match(name) or self.index.classify(name)[0] is not None: return True
+        if name.startswith("."): return False
+        mode = CONFIG.seiri_sniff
+        return mode == "always" or (mode == "fallback" and not self._extension(name))
+
+    def classify(self, file_path):
+        # -> (label, dest dir, stem, suffix); label is None when nothing applies.
+        # seiri_rules are checked first, in order; then the extension categories.
+        name = file_path.name
+        rule = self.rules.match(name, str(file_path), lambda: os.stat(file_path)) if self.rules.rules else None
+        if rule:
+            suffix = self.index.classify(name)[1] or os.path.splitext(name)[1]
+            return rule.label, rule.dest, name[:len(name) - len(suffix)], suffix
+        cat, stem, suffix = self._classify_extension(file_path)
+        return cat, Path.home() / "Desktop" / cat if cat else None, stem, suffix
+
+    @staticmethod
+    def _extension(name):
+        # The name's own extension (".xlsx", ".001"), recognised or not, or ""
+        ext = os.path.splitext(name)[1]
+        return ext if 1 < len(ext) <= 9 and ext[1:].isalnum() else ""
+
+    def _classify_extension(self, file_path):
+        # -> (category, stem, suffix). "fallback" only sniffs names without any extension, and
+        # appends the detected one. "always" lets the content pick the category of named files
+        # too, but keeps their name, and a container signature never overrides another extension.
+        index, name = self.index, file_path.name
+        cat, suffix = index.classify(name)
+        own = self._extension(name)
+        mode = CONFIG.seiri_sniff
+        if mode == "off" or name.startswith(".") or (own and mode != "always"):  # Dotfiles are config, not downloads
+            return cat, name[:len(name) - len(suffix)], suffix
+        for ext in self.sniffer.sniff(file_path):
+            sniffed = index.table.get(ext)
+            if not sniffed or (own and ext in CONTAINER_EXTS and not name.lower().endswith(ext)): continue
+            if not own: return sniffed, name, ext
+            suffix = suffix or own
+            return sniffed, name[:len(name) - len(suffix)], suffix
+        return cat, name[:len(name) - len(suffix)], suffix
+
+    def _link_duplicate(self, existing, src, target):
+        # Same content is already at the destination: the new name becomes a hard link to it
+        # (swapped over our placeholder in one rename) and the download itself is removed
+        tmp = target.with_name(f".{target.name}.kaizen-partial")
+        os.link(existing, tmp)
+        os.replace(tmp, target)
+        os.unlink(src)
+        return 0
+
+    def dispatch_ready(self, path):
+        self.pool.submit(self.process_once, path, time.perf_counter())
+
+    def process_once(self, path, queued=None):
+        if queued is not None: METRICS.lap("queue", queued)
+        try:
+            if self.journal.is_undone(path):
+                METRICS.inc("kaizen_seiri_files_total", result="undone")
+                return False
+            return self.shards.process(path) if self.shards else self.process_file(Path(path))
+        finally: self.events.finished(path)
+
+    def process_file(self, file_path: Path):
+        # -> True when the file was moved
+        try:
+            if not file_path.exists():
+                METRICS.inc("kaizen_seiri_files_total", result="gone")
+                return False
+
+            t = time.perf_counter()
+            cat, dest, stem, suffix = self.classify(file_path)
+            t = METRICS.lap("classify", t)
+            if cat is None:
+                METRICS.inc("kaizen_seiri_files_total", result="skipped")
+                return False
+            dest.mkdir(parents=True, exist_ok=True)
+            if CONFIG.seiri_duplicates not in ("drop", "hardlink"): return self._place(file_path, cat, dest, stem, suffix, t)
+            with self.dedup.hold(dest, file_path): return self._place(file_path, cat, dest, stem, suffix, t)
+        except Exception as e:
+            METRICS.inc("kaizen_seiri_files_total", result="failed")
+            print(f"Linux IO Error: {e}")
+            return False
+
+    def _place(self, file_path, cat, dest, stem, suffix, t):
+        policy = CONFIG.seiri_duplicates
+        dup, hashes = (None, (None, None, None)) if policy not in ("drop", "hardlink") else self.dedup.find(dest, file_path)
+        t = METRICS.lap("dedup", t)
+        if dup and policy == "drop":
+            st = os.lstat(file_path)
+            jid = self.journal.begin("drop", file_path, dest / dup, st.st_size, st.st_ino, cat)
+            try: os.unlink(file_path)
+            except:
+                self.journal.abort(jid)
+                raise
+            self.journal.commit(jid, None)
+            METRICS.inc("kaizen_seiri_files_total", result="duplicate")
+            self.gui_queue.put(("duplicate", file_path.name, cat))
+            return True
+
+        st = os.lstat(file_path)
+        target, jid = self.names.reserve_for(self.journal, dest, stem, suffix, "link" if dup else "move",
+                                             file_path, st.st_size, st.st_ino, cat)
+        t = METRICS.lap("reserve", t)
+        try:
+            if dup: size = self._link_duplicate(dest / dup, file_path, target)
+            else: size = self.mover.move(file_path, target)  # Replaces our own placeholder
+        except:
+            self.names.release(target)
+            self.journal.abort(jid)
+            raise
+        METRICS.lap("move", t)
+        self.journal.commit(jid, os.lstat(target).st_ino)
+        self.dedup.add(target, hashes)
+        METRICS.inc("kaizen_seiri_files_total", result="linked" if dup else "moved")
+        if not dup: METRICS.inc("kaizen_seiri_bytes_moved_total", size)
+        CONFIG.increment_stat("files_moved")
+        self.gui_queue.put(("moved", file_path.name, cat))
+        return True
+
+# --- HEADLESS DAEMON ---
+def _log_notifications(gui_queue):
+    while True:
+        msg = gui_queue.get()
+        if msg[0] == "moved": text = f"Kaizen: {msg[1]} -> {msg[2]}"
+        elif msg[0] == "duplicate": text = f"Kaizen: {msg[1]} already in {msg[2]}, dropped"
+        elif msg[0] == "notify": text = msg[1]
+        else: continue
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {text}", flush=True)
+
+def run_headless():
+    # SIGTERM/SIGINT: drain and exit. SIGHUP: re-read the config and apply the changes live.
+    # Signals are blocked before any thread starts and collected synchronously with sigwait,
+    # so no handler ever runs in the middle of a move.
+    t0 = time.perf_counter()
+    CONFIG.load()
+    sigs = {signal.SIGTERM, signal.SIGINT, signal.SIGHUP}
+    signal.pthread_sigmask(signal.SIG_BLOCK, sigs)
+    gui_queue = queue.Queue()
+    threading.Thread(target=_log_notifications, args=(gui_queue,), name="notify-log", daemon=True).start()
+    automator = AutomationService(gui_queue)
+    automator.start_watching()
+    if not automator._is_running:
+        print(f"KAIZEN headless: no valid watch paths in {CONFIG_FILE}", file=sys.stderr)
+        return 1
+    print(f"KAIZEN headless: watching {len(CONFIG.watch_paths)} path(s), ready in "
+          f"{(time.perf_counter() - t0) * 1000:.0f} ms", flush=True)
+    while True:
+        sig = signal.sigwait(sigs)
+        if sig == signal.SIGHUP:
+            automator.reconfigure()
+            continue
+        automator.stop_watching()
+        CONFIG.flush()
+        return 0
+
+def _parse_when(text):
+    # Unix time, "YYYY-MM-DD[ HH:MM[:SS]]", or an age such as "90m" / "2h" / "1d"
+    try: return float(text)
+    except ValueError: pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"):
+        try: return time.mktime(time.strptime(text, fmt))
+        except ValueError: pass
+    return time.time() - _quantity(text, DURATIONS)
+
+def run_undo(count=None, since=None):
+    # Reverts organized files from the journal alone; the Desktop is never scanned
+    journal = MoveJournal()
+    try: journal.open()
+    except BlockingIOError:
+        print("KAIZEN undo: the organizer is running; stop it first so restored files are not re-sorted", file=sys.stderr)
+        return 1
+    try: restored, skipped = journal.undo(count, since)
+    finally: journal.close()
+    for dst, src in restored: print(f"restored {src}  (from {dst})")
+    for dst, why in skipped: print(f"skipped  {dst}: {why}", file=sys.stderr)
+    print(f"KAIZEN undo: {len(restored)} restored, {len(skipped)} skipped")
+    return 0 if not skipped else 2
+
+def run_rules():
+    # Rules that fail to compile are reported by RuleSet and left out, as the organizer does
+    CONFIG.load()
+    rules = RuleSet(CONFIG.seiri_rules)
+    rows = rules.rows()
+    width = max((len(dest) for dest, _ in rows), default=0)
+    for i, (dest, text) in enumerate(rows, 1): print(f"{i:>3}  {dest:<{width}}  {text}")
+    print(f"KAIZEN rules: {len(rows)} of {len(CONFIG.seiri_rules or [])} compiled")
+    return 0 if len(rows) == len(CONFIG.seiri_rules or []) else 1
+
+def run_shard(fd):
+    # One organizer process when seiri_processes > 1, started by ShardSet with one end of a
+    # socketpair. Runs the FileHandler pipeline on the files the parent sends; names, journal
+    # records, stats and notifications go back to the parent. Exits when told to or when the
+    # parent goes away; Ctrl-C is the parent's to handle.
+    from multiprocessing.connection import Connection
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    CONFIG.load()
+    stop = threading.Event()
+    pool = WorkerPool(CONFIG.seiri_workers + CONFIG.seiri_bulk_workers, 1 << 20)  # The parent's lanes bound what is in flight
+    methods = {}
+    parent = Channel(Connection(fd), pool, methods, on_close=stop.set)
+    link = ParentLink(parent)
+    CONFIG.increment_stat = link.stat  # The parent owns the stats (and the config file)
+    dedup = DuplicateIndex(on_seed=link.watch, on_add=link.placed, locks=link)
+    handler = FileHandler(link, pool, ExtensionIndex(CONFIG.extensions), RuleSet(CONFIG.seiri_rules), link, dedup, link)
+
+    def reconfigure():
+        changed = CONFIG.reload()
+        if "extensions" in changed: handler.index = ExtensionIndex(CONFIG.extensions)
+        if "seiri_rules" in changed: handler.rules = RuleSet(CONFIG.seiri_rules)
+        if changed & {"seiri_workers", "seiri_bulk_workers"}: pool.resize(CONFIG.seiri_workers + CONFIG.seiri_bulk_workers)
+
+    methods.update(process=lambda path: handler.process_file(Path(path)), note=dedup.note, discard=dedup.discard,
+                   reconfigure=reconfigure, stop=stop.set)
+    parent.start()
+    while not stop.wait(1.0): parent.notify("metrics", METRICS.snapshot())
+    pool.shutdown()
+    dedup.save()
+    parent.notify("metrics", METRICS.snapshot())
+    return 0
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="KAIZEN Seiri organizer without a GUI")
+    ap.add_argument("--headless", action="store_true", help=argparse.SUPPRESS)  # Passed through by kaizen_linux.py
+    ap.add_argument("--undo", type=int, metavar="N", help="move the last N organized files back, then exit")
+    ap.add_argument("--undo-since", metavar="WHEN", help="move back everything organized since WHEN "
+                    "(unix time, 'YYYY-MM-DD HH:MM' or an age like 2h), then exit")
+    ap.add_argument("--rules", action="store_true", help="check seiri_rules and print them in the settings "
+                    "editor's dest / pattern form, then exit")
+    ap.add_argument("--shard", type=int, metavar="FD", help=argparse.SUPPRESS)  # Started by ShardSet
+    args = ap.parse_args(argv)
+    if args.shard is not None: return run_shard(args.shard)
+    if args.rules: return run_rules()
+    if args.undo is None and args.undo_since is None: return run_headless()
+    try: since = _parse_when(args.undo_since) if args.undo_since else None
+    except ValueError: ap.error(f"cannot parse --undo-since {args.undo_since!r}")
+    return run_undo(args.undo, since)
+
+if __name__ == "__main__":
+    sys.exit(main())
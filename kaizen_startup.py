@@ -0,0 +1,58 @@
+import builtins
+import collections
+import sys
+import threading
+import time
+
+# Cold-start profiler shared by both HUDs. Imported first thing (before tkinter) so the
+# import hook sees every heavy module; a no-op unless --profile-startup is on the command line.
+# Usage: python3 kaizen_linux.py --profile-startup[=BUDGET_MS]
+
+class StartupProfile:
+    def __init__(self, argv=None, clock=time.perf_counter):
+        self.clock = clock
+        self.t0 = self.last = clock()
+        self.enabled, self.budget_ms = False, None
+        for arg in (sys.argv[1:] if argv is None else argv):
+            if arg == "--profile-startup" or arg.startswith("--profile-startup="):
+                self.enabled = True
+                if "=" in arg: self.budget_ms = float(arg.split("=", 1)[1])
+        self.phases = []                        # (name, seconds since the previous mark)
+        self.imports = collections.Counter()    # top-level package -> inclusive seconds
+        self.depth = 0
+        if self.enabled: self._hook()
+
+    def _hook(self):
+        # Times only outermost imports on the main thread, so a package's cost includes its deps
+        real, main = builtins.__import__, threading.main_thread()
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if self.depth or level or threading.current_thread() is not main or name in sys.modules:
+                return real(name, globals, locals, fromlist, level)
+            self.depth += 1
+            t = self.clock()
+            try: return real(name, globals, locals, fromlist, level)
+            finally:
+                self.depth -= 1
+                self.imports[name.partition(".")[0]] += self.clock() - t
+        builtins.__import__ = timed_import
+
+    def mark(self, name):
+        if not self.enabled: return
+        now = self.clock()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def total_ms(self):
+        return (self.last - self.t0) * 1000
+
+    def report(self, top=12):
+        lines = ["KAIZEN startup:"]
+        lines += [f"  {name:<24} {dt * 1000:8.1f} ms" for name, dt in self.phases]
+        lines.append(f"  {'total':<24} {self.total_ms():8.1f} ms" +
+                     (f"  (budget {self.budget_ms:.0f} ms{', OVER' if self.over_budget() else ''})" if self.budget_ms else ""))
+        lines.append("Imports (inclusive):")
+        lines += [f"  {name:<24} {dt * 1000:8.1f} ms" for name, dt in self.imports.most_common(top)]
+        return "\n".join(lines)
+
+    def over_budget(self):
+        return self.budget_ms is not None and self.total_ms() > self.budget_ms
@@ -0,0 +1,95 @@
+import math
+import time
+
+# Tk-free focus timer shared by the Linux HUD and the Windows Midnight UI.
+# The GUI calls poll() from its after() callback and sleeps next_delay_ms() between calls.
+
+class FocusTimer:
+    # Pomodoro phases driven by monotonic deadlines instead of counting 1 s callbacks, so
+    # late callbacks never add up to drift. Phase boundaries are anchored to the previous
+    # deadline, and focus minutes are credited from measured elapsed time.
+    def __init__(self, duration, clock=time.monotonic, max_gap=15.0):
+        self.duration = duration  # mode -> seconds; read at every phase start
+        self.clock = clock
+        self.max_gap = max_gap    # A longer silence between polls is a suspend, not focus
+        self.mode = "WORK"
+        self.running = False
+        self.total = max(1, duration("WORK"))
+        self.left = float(self.total)  # Remaining seconds while paused
+        self.deadline = None
+        self.last_poll = None
+        self.credit = 0.0              # Focused seconds not yet reported as whole minutes
+
+    def start(self, mode="WORK"):
+        # Begins a fresh phase
+        self.mode = mode
+        self.total = max(1, self.duration(mode))
+        self.left = float(self.total)
+        self.credit = 0.0
+        self.resume()
+
+    def resume(self):
+        if self.running: return
+        now = self.clock()
+        self.deadline = now + self.left
+        self.last_poll = now
+        self.running = True
+
+    def pause(self):
+        # Keeps the remaining time (and the partial minute) for resume()
+        if not self.running: return []
+        events = self.poll()
+        self.left = self.remaining()
+        self.running = False
+        return events
+
+    def remaining(self):
+        if not self.running: return self.left
+        return max(0.0, self.deadline - self.clock())
+
+    def display_seconds(self):
+        # Whole seconds to show: 25:00 right after start, 00:00 only at the deadline
+        return math.ceil(self.remaining() - 1e-9)
+
+    def progress(self):
+        return (self.total - self.remaining()) / self.total if self.total else 1.0
+
+    def poll(self):
+        # Advances the state machine to now. Returns a list of events:
+        #   ("minutes", n)  n more whole minutes of focus were completed
+        #   ("switch", m)   the phase ended and mode m started
+        if not self.running: return []
+        now = self.clock()
+        gap = now - self.last_poll
+        if gap > self.max_gap:
+            # Suspended (or stalled) for `gap`: resume where we were instead of fast-forwarding
+            self.deadline += gap
+            gap = 0.0
+        self.last_poll = now
+        events = []
+        while True:
+            if self.mode == "WORK":
+                # Only time inside the phase counts; the rest belongs to the next phase
+                self.credit += max(0.0, min(now, self.deadline) - (now - gap))
+            if now < self.deadline: break
+            gap = now - self.deadline
+            self._flush_minutes(events)
+            self.credit = 0.0
+            self.mode = "BREAK" if self.mode == "WORK" else "WORK"
+            self.total = max(1, self.duration(self.mode))
+            self.deadline += self.total
+            events.append(("switch", self.mode))
+        self._flush_minutes(events)
+        return events
+
+    def _flush_minutes(self, events):
+        n = int((self.credit + 1e-6) // 60)
+        if n:
+            self.credit = max(0.0, self.credit - n * 60)
+            events.append(("minutes", n))
+
+    def next_delay_ms(self):
+        # Wake up just after the displayed second changes rather than every 1000 ms
+        rem = self.remaining()
+        frac = rem - math.floor(rem)
+        return max(1, int((frac if frac > 1e-3 else 1.0) * 1000) + 1)
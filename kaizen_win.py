@@ -1,21 +1,28 @@
+import sys
+from kaizen_startup import StartupProfile
+
+PROFILE = StartupProfile()  # Before any heavy import so --profile-startup can attribute it
+
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import ttk
 import shutil
 import os
-import sys
+import errno
 import time
 import threading
-import subprocess
-import webbrowser
 import json
 import queue
+import heapq
+import itertools
 import winsound
-import keyboard
 import math
-from datetime import datetime
 from pathlib import Path
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from kaizen_timer import FocusTimer
+from kaizen_palette import Animator, shade
+# watchdog, keyboard, subprocess and webbrowser are imported where first used, after the
+# main window is on screen
+PROFILE.mark("imports")
+FRAME_STATS = "--frame-stats" in sys.argv[1:]  # Print the pulse animation cost on quit
 
 # --- MIDNIGHT MODULAR PALETTE ---
 COLORS = {
@@ -44,22 +51,7 @@ FONTS = {
 CONFIG_FILE = Path.home() / ".kaizen_midnight_config.json"
 NOTES_FILE = Path.home() / "kaizen_brain_dump.txt"
 OVERLAY_POSITIONS = ["TOP_CENTER", "TOP_LEFT", "TOP_RIGHT", "BOTTOM_CENTER", "BOTTOM_LEFT", "BOTTOM_RIGHT"]
-
-# --- UTILS ---
-def hex_to_rgb(hex_val):
-    hex_val = hex_val.lstrip('#')
-    return tuple(int(hex_val[i:i+2], 16) for i in (0, 2, 4))
-
-def rgb_to_hex(rgb):
-    return '#%02x%02x%02x' % tuple(map(int, rgb))
-
-def interpolate_color(color1, color2, t):
-    c1 = hex_to_rgb(color1)
-    c2 = hex_to_rgb(color2)
-    r = c1[0] + (c2[0] - c1[0]) * t
-    g = c1[1] + (c2[1] - c1[1]) * t
-    b = c1[2] + (c2[2] - c1[2]) * t
-    return rgb_to_hex((r, g, b))
+TEMP_SUFFIXES = ('.part', '.tmp', '.crdownload')  # In-progress downloads, never organized
 
 # --- CONFIG ---
 class Config:
@@ -81,12 +73,18 @@ class Config:
         self.overlay_pos = "TOP_CENTER"
         self.hotkey_start = "ctrl+shift+space"
         self.hotkey_notes = "ctrl+j"
+        self.seiri_workers = 4         # Concurrent file moves
+        self.seiri_queue_size = 1024   # Pending files before the watcher blocks (backpressure)
+        self.seiri_settle_min = 0.05   # First write-completion probe (s), doubled per unsettled probe
+        self.seiri_settle_max = 2.0    # Probe interval cap (s)
+        self.seiri_settle_quiet = 1.5  # Size/mtime must stay unchanged this long (s)
+        self.seiri_retries = 6         # Attempts after a sharing violation, backing off from seiri_settle_quiet
         
         self.stats = {
             "xp": 0, "level": 1, "files_moved": 0,
             "minutes_focused": 0, "sessions_completed": 0
         }
-        self.load()
+        # Loaded by main(), not at import time
 
     def add_xp(self, amount):
         self.stats["xp"] += amount
@@ -107,6 +105,126 @@ class Config:
 
 CONFIG = Config()
 
+# --- WORKER POOL ---
+class WorkerPool:
+    # Fixed set of worker threads fed by a bounded queue. submit() blocks while the
+    # queue is full, so a burst of events throttles the watcher instead of spawning threads.
+    def __init__(self, workers, queue_size):
+        self.tasks = queue.Queue(maxsize=max(1, queue_size))
+        self.threads = [threading.Thread(target=self._run, name=f"seiri-{i}", daemon=True)
+                        for i in range(max(1, workers))]
+        for t in self.threads: t.start()
+
+    def submit(self, fn, *args):
+        self.tasks.put((fn, args))
+
+    def _run(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None: return
+                fn, args = task
+                fn(*args)
+            except: pass
+            finally: self.tasks.task_done()
+
+    def shutdown(self, idle=None):
+        # Sentinels queue up behind pending work, so everything already accepted is drained.
+        # idle() runs between short joins when the caller must keep serving something meanwhile.
+        for _ in self.threads: self.tasks.put(None)
+        for t in self.threads:
+            while t.is_alive():
+                t.join(0.05)
+                if idle: idle()
+
+# --- SETTLE PROBES ---
+class SettleQueue:
+    # Files waiting to stop changing. One thread re-probes size/mtime with exponential backoff
+    # (seiri_settle_min doubling up to seiri_settle_max) and hands a file to ready(path, attempt)
+    # once they have not changed for seiri_settle_quiet seconds. Agreeing probes alone prove
+    # little on NTFS: mtime is updated lazily and Explorer copies set the final size before
+    # writing any data. Nothing here holds a pool worker while a download is still growing.
+    def __init__(self, ready):
+        self.ready = ready
+        self.cond = threading.Condition()
+        self.heap = []     # (due, seq, path)
+        self.pending = {}  # path -> [(size, mtime_ns), unchanged since, next delay, attempt]
+        self.seq = itertools.count()
+        self.closed = False
+        threading.Thread(target=self._run, name="seiri-settle", daemon=True).start()
+
+    def add(self, path, attempt=0, delay=0.0):
+        with self.cond:
+            if path in self.pending or self.closed: return  # Already being probed
+            self.pending[path] = [None, 0.0, CONFIG.seiri_settle_min, attempt]
+            heapq.heappush(self.heap, (time.monotonic() + delay, next(self.seq), path))
+            self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.closed and (not self.heap or self.heap[0][0] > time.monotonic()):
+                    self.cond.wait(self.heap[0][0] - time.monotonic() if self.heap else None)
+                if self.closed: return
+                path = heapq.heappop(self.heap)[2]
+            self._probe(path)
+
+    def _probe(self, path):
+        try:
+            st = os.stat(path)
+            sig = (st.st_size, st.st_mtime_ns)
+        except OSError: sig = None  # Gone (or renamed to its final name, which has its own event)
+        now = time.monotonic()
+        with self.cond:
+            entry = self.pending[path]
+            if sig is not None and sig != entry[0]: entry[0], entry[1] = sig, now
+            elif sig is None or now - entry[1] >= CONFIG.seiri_settle_quiet:
+                del self.pending[path]
+                if sig is None: return
+                attempt = entry[3]
+                entry = None
+            if entry:
+                due = now + max(0.01, min(entry[2], entry[1] + CONFIG.seiri_settle_quiet - now))
+                entry[2] = min(entry[2] * 2, CONFIG.seiri_settle_max)
+                heapq.heappush(self.heap, (due, next(self.seq), path))
+                return
+        self.ready(path, attempt)  # May block on the pool queue: that is the backpressure
+
+# --- GUI HANDOFF ---
+class TkWakeQueue(queue.Queue):
+    # Queue that posts a Tk virtual event when it goes from drained to non-empty, so the
+    # main loop only wakes up when a worker or hotkey actually has something for it
+    def __init__(self, widget, sequence):
+        super().__init__()
+        self.widget = widget
+        self.sequence = sequence
+        self._signaled = False
+        self._closed = False
+        self._wake_lock = threading.Lock()
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        with self._wake_lock:
+            if self._signaled or self._closed: return
+            self._signaled = True
+        try: self.widget.event_generate(self.sequence, when="tail")
+        except (tk.TclError, RuntimeError):
+            # Main loop not running (yet/anymore); the next put or the startup drain retries
+            with self._wake_lock: self._signaled = False
+
+    def clear_wakeup(self):
+        with self._wake_lock: self._signaled = False
+
+    def close(self):
+        # Stop waking the main loop: event_generate from a worker waits for the main thread,
+        # which is about to join that worker
+        with self._wake_lock: self._closed = True
+
 # --- SPLASH SCREEN ---
 class SplashScreen(tk.Toplevel):
     def __init__(self, parent):
@@ -122,7 +240,8 @@ class SplashScreen(tk.Toplevel):
         self.cv = tk.Canvas(self, width=w, height=h, bg=COLORS["bg"], highlightthickness=0)
         self.cv.pack()
         self.step = 0
-        self.animate_rose()
+        self.rose = Animator(self.after, self.after_cancel, self.animate_rose, 5)
+        self.rose.start()
         
     def animate_rose(self):
         center_x, center_y = 150, 150
@@ -134,13 +253,13 @@ class SplashScreen(tk.Toplevel):
                 r = scale * math.cos(k * theta)
                 x = center_x + r * math.cos(theta)
                 y = center_y + r * math.sin(theta)
-                col = interpolate_color(COLORS["accent"], COLORS["accent_glow"], (math.sin(theta)+1)/2)
+                col = shade(COLORS["accent"], COLORS["accent_glow"], (math.sin(theta)+1)/2)
                 self.cv.create_oval(x, y, x+2, y+2, fill=col, outline="")
                 self.step += 1
-            self.after(5, self.animate_rose)
-        else:
-            self.cv.create_text(150, 260, text="KAIZEN // MIDNIGHT", fill=COLORS["fg"], font=FONTS["header"])
-            self.after(1000, self.fade_out)
+            return True
+        self.cv.create_text(150, 260, text="KAIZEN // MIDNIGHT", fill=COLORS["fg"], font=FONTS["header"])
+        self.after(1000, self.fade_out)
+        return False
 
     def fade_out(self):
         alpha = self.attributes("-alpha")
@@ -417,47 +536,83 @@ class KaizenMidnight(tk.Tk):
         super().__init__()
         self.withdraw()
         
-        splash = SplashScreen(self)
-        self.wait_window(splash) 
-        
-        self.queue = queue.Queue()
-        self.observer = Observer()
+        self.queue = TkWakeQueue(self, "<<KaizenQueue>>")
+        self.bind("<<KaizenQueue>>", lambda e: self._poll_queue())
+        self.pool = WorkerPool(CONFIG.seiri_workers, CONFIG.seiri_queue_size)
+        self.settle = SettleQueue(lambda path, attempt: self.pool.submit(self._process_file, path, attempt))
+        self.observer = None  # Created by the first _reload_system
+        self.watches = {}  # watch path -> ObservedWatch on the single long-lived observer
         self.settings_win = None
-        self.brain_dump = BrainDump(self); self.brain_dump.withdraw()
+        self.brain_dump = None  # Built on first use
         self.overlay = None 
         
         self.pomo_active = False
-        self.mode = "WORK"
-        self.time_left = CONFIG.pomo_work * 60
-        self.total_time = self.time_left
+        self.timer = FocusTimer(lambda mode: (CONFIG.pomo_break if mode == "BREAK" else CONFIG.pomo_work) * 60)
+        self._tick_job = None
         self.pulse_phase = 0.0
+        self._glow = None
+        # Pulses only during a session and only while the window is mapped
+        self.pulse = Animator(self.after, self.after_cancel, self._animate_pulse, 50)
         
-        self._init_file_handler()
         self._setup_window()
         self._build_modular_ui()
-        self._reload_system()
         self.deiconify()
-        self._animate_pulse()
+        self.update_idletasks()
+        PROFILE.mark("window")
+        # The splash plays over the finished window instead of blocking it
+        if not PROFILE.enabled: SplashScreen(self)
+        self.after_idle(self._start_services)
+
+    def _start_services(self):
+        self._reload_system()
+        self._poll_queue()  # Anything queued before the main loop started
+        PROFILE.mark("watcher")
+        if PROFILE.enabled:
+            print(PROFILE.report())
+            self.quit_app(1 if PROFILE.over_budget() else 0)
 
     def _init_file_handler(self):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+        self.observer = Observer()
         self.handler = FileSystemEventHandler()
-        self.handler.on_created = lambda e: threading.Thread(target=self._process_file, args=(Path(e.src_path),), daemon=True).start() if not e.is_directory else None
+        self.handler.on_created = lambda e: self._file_arrived(e.src_path) if not e.is_directory else None
+        # Browsers download to .crdownload/.part and rename to the final name when done
+        self.handler.on_moved = lambda e: self._file_arrived(e.dest_path) if not e.is_directory else None
+
+    def _category(self, path):
+        if path.name.lower().endswith(TEMP_SUFFIXES): return None
+        suffix = path.suffix.lower()
+        return next((cat for cat, exts in self.rules if suffix in exts), None)
 
-    def _process_file(self, path):
-        time.sleep(1.5)
+    def _file_arrived(self, src):
+        # Only files a rule will move are probed at all
+        path = Path(src)
+        if self._category(path): self.settle.add(path)
+
+    def _process_file(self, path, attempt=0):
         try:
-            if not path.exists(): return
-            for cat, exts in CONFIG.extensions.items():
-                if path.suffix.lower() in exts:
-                    dest = Path.home() / "Desktop" / cat
-                    dest.mkdir(parents=True, exist_ok=True)
-                    new_path = dest / path.name
-                    if new_path.exists(): new_path = dest / f"{path.stem}_{int(time.time())}{path.suffix}"
-                    shutil.move(str(path), str(new_path))
-                    CONFIG.add_xp(15)
-                    CONFIG.stats["files_moved"] += 1
-                    self.queue.put(("notify", f"SEIRI: {path.name}"))
-                    return
+            cat = self._category(path)
+            if not cat: return  # Rules changed since it arrived
+            dest = Path.home() / "Desktop" / cat
+            dest.mkdir(parents=True, exist_ok=True)
+            new_path = dest / path.name
+            if new_path.exists(): new_path = dest / f"{path.stem}_{int(time.time())}{path.suffix}"
+            try: os.rename(path, new_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV: raise
+                shutil.copy2(path, new_path)
+                try: os.unlink(path)
+                except OSError:
+                    os.unlink(new_path)  # Still open elsewhere: keep the original whole and retry
+                    raise
+            CONFIG.stats["files_moved"] += 1
+            CONFIG.add_xp(15)  # Saves, files_moved included
+            self.queue.put(("notify", f"SEIRI: {path.name}"))
+        except PermissionError:
+            # Sharing violation: the writer (or a scanner) still has it open. It goes back to
+            # the settle probes after a growing pause, so the worker is free meanwhile.
+            if attempt < CONFIG.seiri_retries: self.settle.add(path, attempt + 1, CONFIG.seiri_settle_quiet * 2 ** attempt)
         except: pass
 
     def _setup_window(self):
@@ -473,19 +628,25 @@ class KaizenMidnight(tk.Tk):
         
         self.bind("<ButtonPress-1>", lambda e: setattr(self, 'd', (e.x, e.y)))
         self.bind("<B1-Motion>", lambda e: self.geometry(f"+{self.winfo_x()+(e.x-self.d[0])}+{self.winfo_y()+(e.y-self.d[1])}"))
+        # Toplevel bindings also fire for every child widget; only the window itself matters here
+        self.bind("<Unmap>", lambda e: self.pulse.hide() if e.widget is self else None)
+        self.bind("<Map>", lambda e: self.pulse.show() if e.widget is self else None)
 
     def _animate_pulse(self):
-        if self.pomo_active:
-            val = (math.sin(self.pulse_phase) + 1) / 2
-            target = COLORS["accent"] if self.mode == "WORK" else COLORS["break_mode"]
-            glow = interpolate_color(COLORS["module"], target, val * 0.3)
-            self.mod_timer.config(bg=glow)
-            self.cv_timer.config(bg=glow)
-            self.pulse_phase += 0.15
-        else:
+        if not self.pomo_active:
+            self._glow = None
             self.mod_timer.config(bg=COLORS["module"])
             self.cv_timer.config(bg=COLORS["module"])
-        self.after(50, self._animate_pulse)
+            return False
+        val = (math.sin(self.pulse_phase) + 1) / 2
+        target = COLORS["accent"] if self.timer.mode == "WORK" else COLORS["break_mode"]
+        glow = shade(COLORS["module"], target, val * 0.3)
+        if glow != self._glow:  # Neighbouring frames often land on the same LUT entry
+            self._glow = glow
+            self.mod_timer.config(bg=glow)
+            self.cv_timer.config(bg=glow)
+        self.pulse_phase += 0.15
+        return True
 
     def _build_modular_ui(self):
         # 1. STATUS
@@ -541,24 +702,30 @@ class KaizenMidnight(tk.Tk):
             self.settings_win = SettingsWindow(self, self._reload_system)
 
     def toggle_brain_dump(self):
-        if self.brain_dump.winfo_viewable(): self.brain_dump.hide()
+        if self.brain_dump is None: self.brain_dump = BrainDump(self); self.brain_dump.text.focus_set()
+        elif self.brain_dump.winfo_viewable(): self.brain_dump.hide()
         else: self.brain_dump.deiconify(); self.brain_dump.text.focus_set()
 
     def _reload_system(self):
         try:
+            import keyboard
             keyboard.unhook_all()
             keyboard.add_hotkey(CONFIG.hotkey_start, lambda: self.queue.put(("toggle", None)))
             keyboard.add_hotkey(CONFIG.hotkey_notes, lambda: self.queue.put(("notes", None)))
         except: pass
         
-        if self.observer: self.observer.stop()
-        self.observer = Observer()
-        for p in CONFIG.watch_paths:
-            if os.path.exists(p): self.observer.schedule(self.handler, p, recursive=False)
-        self.observer.start()
+        # Workers read an immutable snapshot, swapped in one assignment, so the SeiriEditor can
+        # edit CONFIG.extensions while moves are in flight
+        self.rules = tuple((cat, frozenset(e.lower() for e in exts)) for cat, exts in CONFIG.extensions.items())
+
+        # Only watches whose path changed are touched; the observer and in-flight moves keep running
+        if self.observer is None: self._init_file_handler()
+        wanted = {p for p in CONFIG.watch_paths if os.path.exists(p)}
+        for p in [p for p in self.watches if p not in wanted]: self.observer.unschedule(self.watches.pop(p))
+        for p in wanted - set(self.watches): self.watches[p] = self.observer.schedule(self.handler, p, recursive=False)
+        if not self.observer.is_alive(): self.observer.start()
         
         self.btn.config(text=f"ENGAGE ({CONFIG.hotkey_start})")
-        self.after(200, self._poll_queue)
         self._update_stats()
         
         # Immediate overlay update if toggled off
@@ -576,9 +743,7 @@ class KaizenMidnight(tk.Tk):
     def toggle_session(self):
         self.pomo_active = not self.pomo_active
         if self.pomo_active:
-            self.mode = "WORK"
-            self.time_left = CONFIG.pomo_work * 60
-            self.total_time = self.time_left
+            self.timer.start("WORK")
             self.btn.config(text="TERMINATE", fg=COLORS["alert"], bg=COLORS["module"])
             self.ent_mission.config(state="disabled")
             
@@ -588,57 +753,65 @@ class KaizenMidnight(tk.Tk):
                 self.overlay.deiconify()
                 self.overlay.reposition()
             
+            self.pulse.start()
             if CONFIG.sound_enabled: winsound.Beep(400, 200)
-            for app in CONFIG.monk_apps: subprocess.Popen(app, shell=True)
-            for url in CONFIG.monk_urls: webbrowser.open(url)
+            if CONFIG.monk_apps:
+                import subprocess
+                for app in CONFIG.monk_apps: subprocess.Popen(app, shell=True)
+            if CONFIG.monk_urls:
+                import webbrowser
+                for url in CONFIG.monk_urls: webbrowser.open(url)
             
             self._tick()
         else:
+            self._apply_timer_events(self.timer.pause())
+            if self._tick_job: self.after_cancel(self._tick_job)
+            self._tick_job = None
+            self.pulse.stop()
+            self._glow = None
             self.btn.config(text=f"ENGAGE ({CONFIG.hotkey_start})", fg=COLORS["accent"], bg=COLORS["bg"])
             self.ent_mission.config(state="normal")
             if self.overlay: self.overlay.withdraw()
             self.mod_timer.config(bg=COLORS["module"])
 
     def _tick(self):
-        if self.pomo_active and self.time_left > 0:
-            self.time_left -= 1
-            if self.mode == "WORK" and self.time_left % 60 == 0:
-                CONFIG.add_xp(5)
+        # Re-armed for just after the next displayed second, from a monotonic deadline
+        self._tick_job = None
+        if not self.pomo_active: return
+        self._apply_timer_events(self.timer.poll())
+        
+        m, s = divmod(self.timer.display_seconds(), 60)
+        t_str = f"{m:02}:{s:02}"
+        self.cv_timer.itemconfig(self.txt_timer, text=t_str)
+        
+        w = 200 * self.timer.progress()
+        self.cv_timer.coords(self.bar_fg, 50, 90, 50 + w, 94)
+        col = COLORS["accent"] if self.timer.mode == "WORK" else COLORS["break_mode"]
+        self.cv_timer.itemconfig(self.bar_fg, fill=col)
+        
+        if self.overlay and CONFIG.overlay_enabled:
+            self.overlay.update_status(f"[{self.timer.mode}] {t_str} :: {self.ent_mission.get()}", col)
+        
+        self._tick_job = self.after(self.timer.next_delay_ms(), self._tick)
+
+    def _apply_timer_events(self, events):
+        for kind, value in events:
+            if kind == "minutes":
+                CONFIG.stats["minutes_focused"] += value
+                CONFIG.add_xp(5 * value)
                 self._update_stats()
-            
-            m, s = divmod(self.time_left, 60)
-            t_str = f"{m:02}:{s:02}"
-            self.cv_timer.itemconfig(self.txt_timer, text=t_str)
-            
-            pct = (self.total_time - self.time_left) / self.total_time
-            w = 200 * pct
-            self.cv_timer.coords(self.bar_fg, 50, 90, 50 + w, 94)
-            col = COLORS["accent"] if self.mode == "WORK" else COLORS["break_mode"]
-            self.cv_timer.itemconfig(self.bar_fg, fill=col)
-            
-            if self.overlay and CONFIG.overlay_enabled:
-                self.overlay.update_status(f"[{self.mode}] {t_str} :: {self.ent_mission.get()}", col)
-            
-            self.after(1000, self._tick)
-        elif self.pomo_active:
-            self._switch_phase()
+            elif kind == "switch": self._switch_phase(value)
 
-    def _switch_phase(self):
+    def _switch_phase(self, mode):
         if CONFIG.sound_enabled: winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
-        if self.mode == "WORK":
-            self.mode = "BREAK"
-            self.time_left = CONFIG.pomo_break * 60
+        if mode == "BREAK":
             CONFIG.add_xp(50)
             CONFIG.stats["sessions_completed"] += 1
-        else:
-            self.mode = "WORK"
-            self.time_left = CONFIG.pomo_work * 60
-        
-        self.total_time = self.time_left
         self._update_stats()
-        self._tick()
 
     def _poll_queue(self):
+        # Runs on <<KaizenQueue>> only: drain everything posted since the last wakeup in one batch
+        self.queue.clear_wakeup()
         try:
             while True:
                 msg = self.queue.get_nowait()
@@ -646,15 +819,29 @@ class KaizenMidnight(tk.Tk):
                 elif msg[0] == "toggle": self.toggle_session()
                 elif msg[0] == "notes": self.toggle_brain_dump()
         except: pass
-        self.after(200, self._poll_queue)
 
-    def quit_app(self):
-        CONFIG.save()
-        self.observer.stop()
-        try: keyboard.unhook_all()
+    def quit_app(self, code=0):
+        if FRAME_STATS: print(f"Pulse: {self.pulse.stats()}")
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+        self.settle.close()  # Files still settling are picked up by nothing; they stay in Downloads
+        self.queue.close()
+        self.withdraw()
+        # A worker may already be inside event_generate; keep serving Tk until they are all done
+        self.pool.shutdown(idle=self.update)
+        CONFIG.save()  # After the drain, so the stats of the last moves are kept
+        try:
+            import keyboard
+            keyboard.unhook_all()
         except: pass
         self.destroy()
-        sys.exit()
+        sys.exit(code)
+
+def main():
+    CONFIG.load()
+    PROFILE.mark("config")
+    KaizenMidnight().mainloop()
 
 if __name__ == "__main__":
-    KaizenMidnight().mainloop()
\ No newline at end of file
+    main()
\ No newline at end of file
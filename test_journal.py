@@ -0,0 +1,155 @@
+import json
+import os
+import queue
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# kaizen_seiri resolves its config, journal and Desktop paths from HOME at import time
+HOME = tempfile.mkdtemp(prefix="kaizen-test-")
+os.environ["HOME"] = HOME
+import kaizen_seiri as k
+
+
+def wait_for(cond, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > deadline: return False
+        time.sleep(0.05)
+    return True
+
+
+class Crash(Exception):
+    pass
+
+
+class RecoveryTest(unittest.TestCase):
+    # Each case leaves the log as a crash at one point of a move would, then reopens it
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp(dir=HOME))
+        self.src_dir, self.dest = self.root / "in", self.root / "out"
+        self.src_dir.mkdir()
+        self.dest.mkdir()
+        self.path = self.root / "moves.jsonl"
+        self.journal = k.MoveJournal(self.path)
+        self.journal.open()
+        self.names = k.NameIndex()
+
+    def tearDown(self):
+        if self.journal.fd is not None: self.journal.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def download(self, name, data=b"data"):
+        p = self.src_dir / name
+        p.write_bytes(data)
+        return p
+
+    def reserve(self, src):
+        stem, suffix = os.path.splitext(src.name)
+        st = src.stat()
+        return self.names.reserve_for(self.journal, self.dest, stem, suffix, "move", src, st.st_size, st.st_ino, "Documents")
+
+    def reopen(self):
+        self.journal.close()
+        self.journal = k.MoveJournal(self.path)
+        return self.journal.open()
+
+    def test_intent_without_placeholder_rolls_back(self):
+        src = self.download("a.pdf")
+        create = k.NameIndex._create
+        k.NameIndex._create = staticmethod(lambda target: (_ for _ in ()).throw(Crash()))
+        try: self.assertRaises(Crash, self.reserve, src)
+        finally: k.NameIndex._create = staticmethod(create)
+        # The abort written on the way out would not exist after a real crash
+        lines = [l for l in self.path.read_text().splitlines() if '"op":"abort"' not in l]
+        self.path.write_text("".join(l + "\n" for l in lines))
+        self.assertEqual(self.reopen(), {"finished": 0, "rolled_back": 1})
+        self.assertEqual(src.read_bytes(), b"data")
+        self.assertEqual(os.listdir(self.dest), [])
+
+    def test_placeholder_without_move_is_removed(self):
+        src = self.download("b.pdf")
+        target, _ = self.reserve(src)
+        self.assertTrue(target.exists())
+        self.assertEqual(self.reopen(), {"finished": 0, "rolled_back": 1})
+        self.assertFalse(target.exists())
+        self.assertTrue(src.exists())
+
+    def test_landed_copy_is_finished(self):
+        src = self.download("c.pdf")
+        target, _ = self.reserve(src)
+        shutil.copy2(src, target)  # Copied across devices, crashed before the source unlink
+        self.assertEqual(self.reopen(), {"finished": 1, "rolled_back": 0})
+        self.assertFalse(src.exists())
+        self.assertEqual(target.read_bytes(), b"data")
+
+    def test_foreign_file_at_picked_name_is_untouched(self):
+        self.names.reserve(self.dest, "seed", ".txt")  # Seeds the name index before the file appears
+        (self.dest / "d.pdf").write_bytes(b"theirs")
+        src = self.download("d.pdf")
+        target, _ = self.reserve(src)
+        self.assertEqual(target.name, "d_1.pdf")
+        self.reopen()
+        self.assertEqual((self.dest / "d.pdf").read_bytes(), b"theirs")
+        self.assertTrue(src.exists())
+
+    def test_undo_restores_and_remembers_until_changed(self):
+        src = self.download("e.pdf")
+        target, jid = self.reserve(src)
+        k.MoveEngine().move(src, target)
+        self.journal.commit(jid, os.lstat(target).st_ino)
+        restored, skipped = self.journal.undo(1)
+        self.assertEqual((restored, skipped), ([(str(target), str(src))], []))
+        self.assertEqual(src.read_bytes(), b"data")
+        self.reopen()
+        self.assertTrue(self.journal.is_undone(src))
+        self.assertEqual(self.journal.undo(1), ([], []))  # Already undone
+        os.utime(src, ns=(0, 0))
+        self.assertFalse(self.journal.is_undone(src))
+
+
+class UndoSweepTest(unittest.TestCase):
+    # --undo, then a restart with the default start-up sweep: the restored files stay put
+    def setUp(self):
+        self.downloads = Path(HOME, "Downloads")
+        self.downloads.mkdir(exist_ok=True)
+        with open(k.CONFIG_FILE, "w") as f:
+            json.dump({"watch_paths": [str(self.downloads)], "seiri_sweep_on_start": True}, f)
+        k.CONFIG.load()
+        self.docs = Path(HOME, "Desktop", "Documents")
+
+    def start(self):
+        service = k.AutomationService(queue.Queue())
+        service.start_watching()
+        return service
+
+    def test_undone_files_are_not_swept_until_changed(self):
+        service = self.start()
+        try:
+            for name in ("f.pdf", "g.pdf"):
+                (self.downloads / name).write_bytes(name.encode())
+                os.utime(self.downloads / name, (1, 1))  # Old enough for a sweep to take it at once
+            self.assertTrue(wait_for(lambda: all((self.docs / n).exists() for n in ("f.pdf", "g.pdf"))))
+        finally: service.stop_watching()
+        journal = k.MoveJournal()
+        journal.open()
+        try: self.assertEqual(len(journal.undo(2)[0]), 2)
+        finally: journal.close()
+
+        service = self.start()
+        try:
+            report = service.sweep()
+            self.assertTrue(wait_for(lambda: not report.scanning and report.done >= report.queued))
+            self.assertEqual(sorted(os.listdir(self.downloads)), ["f.pdf", "g.pdf"])
+            with open(self.downloads / "f.pdf", "ab") as f: f.write(b" edited")
+            os.utime(self.downloads / "f.pdf", (2, 2))
+            service.sweep()
+            self.assertTrue(wait_for(lambda: not (self.downloads / "f.pdf").exists()))
+            self.assertTrue((self.downloads / "g.pdf").exists())
+        finally: service.stop_watching()
+
+
+if __name__ == "__main__":
+    unittest.main()